@@ -1,27 +1,110 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from . import models, schemas, database
 import os
+import threading
+import time
 
 # SECRET_KEY should be in env variables, using a default for dev
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated users are cached in-process by token subject, so protected
+# endpoints don't look the user up on every request.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# When enabled, tokens carrying a "uid" claim are trusted as-is and no user
+# lookup happens at all. Changes to a user then only apply to new tokens.
+TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# bcrypt cost factor. Each +1 doubles the time per hash; existing hashes are
+# upgraded (or downgraded) to this cost on the user's next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt releases the GIL, so hashing in a small dedicated pool keeps the
+# event loop free and bounds the cores spent on hashing during login storms.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# Comma-separated emails allowed to use the /admin endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+class PrincipalCache:
+    """Thread-safe TTL + LRU cache of authenticated users keyed by token subject."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[schemas.User]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return principal
+
+    def put(self, subject: str, principal: schemas.User):
+        with self._lock:
+            self._entries[subject] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = PrincipalCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.email)
+    # The email itself may have changed
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        user_cache.invalidate(old_email)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def needs_rehash(hashed_password) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+# For sync route handlers: they already run in FastAPI's threadpool, and waiting
+# on the hash pool keeps concurrent bcrypt work at PASSWORD_HASH_WORKERS.
+def pooled_verify_password(plain_password, hashed_password) -> bool:
+    return _hash_executor.submit(verify_password, plain_password, hashed_password).result()
+
+def pooled_password_hash(password) -> str:
+    return _hash_executor.submit(get_password_hash, password).result()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,7 +115,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> schemas.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,7 +129,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
+
+    user_id = payload.get("uid")
+    if TRUST_TOKEN_CLAIMS and isinstance(user_id, int):
+        return schemas.User(id=user_id, email=token_data.email, is_active=True)
+
+    principal = user_cache.get(token_data.email)
+    if principal is not None:
+        return principal
+
     user = db.query(models.User).filter(models.User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
-    return user
+    principal = schemas.User(id=user.id, email=user.email, is_active=user.is_active)
+    user_cache.put(token_data.email, principal)
+    return principal
+
+def get_current_admin(current_user: schemas.User = Depends(get_current_user)) -> schemas.User:
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
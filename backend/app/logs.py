@@ -0,0 +1,52 @@
+"""Logging setup for the API process.
+
+Modules log through logging.getLogger(__name__). LOG_LEVEL sets the
+threshold for the app's loggers (default INFO; DEBUG adds per-batch
+generation detail; an unknown level falls back to INFO with a warning). LOG_FORMAT=json writes one JSON object per line,
+including any `extra` fields, for log shippers; the default is plain text.
+"""
+import json
+import logging
+import os
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name)
+    # getLevelName returns "Level <name>" for names it does not know
+    return level if isinstance(level, int) else logging.INFO
+
+def configure():
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    # DEBUG is for this app's own detail, not every library's
+    level = _level(LOG_LEVEL)
+    root.setLevel(max(level, logging.INFO))
+    logging.getLogger("app").setLevel(level)
+    if level != logging.getLevelName(LOG_LEVEL):
+        logging.getLogger(__name__).warning("Unknown LOG_LEVEL %r, using INFO", LOG_LEVEL)
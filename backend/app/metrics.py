@@ -0,0 +1,178 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms are kept in this process's memory and served
+by GET /metrics. Each worker process exposes its own series, so with several
+uvicorn workers Prometheus scrapes and sums them per instance. Work done in
+the OCR and bulk export process pools is timed in the pool and observed here
+when the result comes back.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+import os
+import threading
+import time
+
+# GET /metrics needs this bearer token. Without one it is closed, unless
+# METRICS_PUBLIC=true opens it (only behind a network that keeps it private).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (not cumulative), then sum and count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+REQUEST_SECONDS = Histogram("examwiz_http_request_duration_seconds", "HTTP request latency, until the response body is sent.", ("method", "route", "status"))
+REQUESTS_IN_PROGRESS = Gauge("examwiz_http_requests_in_progress", "HTTP requests being handled.", ("method",))
+
+OCR_PAGE_SECONDS = Histogram("examwiz_ocr_page_seconds", "Time to get one PDF page's text, by text layer or OCR.", ("method",), SLOW_BUCKETS)
+INGEST_SECONDS = Histogram("examwiz_ingest_seconds", "Chapter processing time from upload to ready or failed.", ("status",), SLOW_BUCKETS)
+
+LLM_CALL_SECONDS = Histogram("examwiz_llm_call_seconds", "LLM completion latency per model.", ("model", "outcome"), SLOW_BUCKETS)
+LLM_TOKENS = Counter("examwiz_llm_tokens_total", "Tokens reported by the LLM provider.", ("model", "kind"))
+LLM_BATCHES = Counter("examwiz_llm_batches_total", "Question batches by how they were served.", ("outcome",))
+GENERATION_SECONDS = Histogram("examwiz_generation_job_seconds", "Generation job time from start to completed or failed.", ("status",), SLOW_BUCKETS)
+
+DB_COMMIT_SECONDS = Histogram("examwiz_db_commit_seconds", "Session commit time, including the final flush.")
+
+EXPORT_RENDER_SECONDS = Histogram("examwiz_export_render_seconds", "Export render time per format.", ("format",))
+EXPORT_CACHE_LOOKUPS = Counter("examwiz_export_cache_lookups_total", "Export cache lookups by result.", ("result",))
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing each request under its route template, not the raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method=method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec(method=method)
+            # Set by the router on match; unmatched paths share one series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=route, status=status)
@@ -0,0 +1,153 @@
+"""Schema changes that create_all cannot apply to an existing database.
+
+create_all only creates missing tables. Columns and indexes added to
+existing tables are applied here, once per database, and recorded in the
+schema_migrations table. Each step is idempotent, so a database created
+fresh from the current models is unaffected.
+
+upgrade() does both and runs once per deploy (python manage.py migrate),
+or at API startup unless AUTO_MIGRATE=false. It holds a lock while it
+runs (a Postgres advisory lock, or a lock file next to a SQLite database),
+so workers starting together apply each step once and the rest wait and
+find the schema current.
+"""
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Iterator, List
+import logging
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from . import models
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("id", String, primary_key=True),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def _create_index(conn: Connection, name: str, table: str, columns: str):
+    existing = {i["name"] for i in inspect(conn).get_indexes(table)}
+    if name not in existing:
+        conn.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
+
+def _chapter_ingest_status(conn: Connection):
+    _add_column(conn, "chapters", "status", "VARCHAR DEFAULT 'ready'")
+    _add_column(conn, "chapters", "content_hash", "VARCHAR")
+    _add_column(conn, "chapters", "source_filename", "VARCHAR")
+    _add_column(conn, "chapters", "error", "TEXT")
+    _create_index(conn, "ix_chapters_content_hash", "chapters", "content_hash")
+
+def _listing_indexes(conn: Connection):
+    _create_index(conn, "ix_chapters_owner_id_created_at", "chapters", "owner_id, created_at")
+    _create_index(conn, "ix_question_sets_owner_id_created_at", "question_sets", "owner_id, created_at")
+    _create_index(conn, "ix_exam_attempts_user_id_completed_at", "exam_attempts", "user_id, completed_at")
+    _create_index(conn, "ix_questions_question_set_id", "questions", "question_set_id")
+
+def _scope_page_cache(conn: Connection):
+    # Old rows were keyed without the uploader and missed nested forms; they are only a cache
+    conn.execute(text("DELETE FROM page_texts"))
+
+def _fail_error_text_chapters(conn: Connection):
+    # Extraction errors used to be saved as the chapter text; mark them failed so they are not reused
+    conn.execute(text(
+        "UPDATE chapters SET status = 'failed', error = content_text "
+        "WHERE status = 'ready' AND content_text LIKE '[Error%'"
+    ))
+
+def _backfill_stats(conn: Connection):
+    # Attempts recorded before the stats tables existed were never folded into them
+    from .services import stats
+    db = Session(bind=conn)
+    try:
+        folded = stats.rebuild(db)
+    finally:
+        db.close()
+    logger.info("Backfilled progress stats from %d attempt(s)", folded)
+
+def _chapter_heartbeat(conn: Connection):
+    _add_column(conn, "chapters", "heartbeat_at", "DATETIME")
+
+MIGRATIONS = [
+    ("0001_chapter_ingest_status", _chapter_ingest_status),
+    ("0002_listing_indexes", _listing_indexes),
+    ("0003_scope_page_cache", _scope_page_cache),
+    ("0004_fail_error_text_chapters", _fail_error_text_chapters),
+    ("0005_backfill_stats", _backfill_stats),
+    ("0006_chapter_heartbeat", _chapter_heartbeat),
+]
+
+# Advisory lock key shared by every process migrating the same Postgres database
+ADVISORY_LOCK_ID = 4815162342
+
+@contextmanager
+def _postgres_lock(engine: Engine) -> Iterator[None]:
+    with engine.connect() as conn:
+        # Session-level lock: it survives the transaction and must be released before the connection is pooled
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    try:
+        import fcntl
+    except ImportError: # Windows: local development only, nothing to race with
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _migration_lock(engine: Engine):
+    if engine.dialect.name == "postgresql":
+        return _postgres_lock(engine)
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        return _file_lock(f"{database}.migrate.lock")
+    return nullcontext()
+
+def run_migrations(engine: Engine):
+    _metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        applied = {row[0] for row in conn.execute(schema_migrations.select())}
+    for migration_id, migrate in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(id=migration_id, applied_at=datetime.utcnow()))
+        logger.info("Applied migration %s", migration_id)
+
+def upgrade(engine: Engine):
+    """Create missing tables, then apply pending migrations, holding the migration lock."""
+    with _migration_lock(engine):
+        models.Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+
+def pending(engine: Engine) -> List[str]:
+    """Tables and migrations upgrade() would still create or apply; empty when the schema is current."""
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    missing = [f"table {name}" for name in models.Base.metadata.tables if name not in existing]
+    applied = set()
+    if schema_migrations.name in existing:
+        with engine.connect() as conn:
+            applied = {row[0] for row in conn.execute(schema_migrations.select())}
+    return missing + [f"migration {migration_id}" for migration_id, _ in MIGRATIONS if migration_id not in applied]
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -14,6 +14,7 @@ class User(Base):
     chapters = relationship("Chapter", back_populates="owner")
     question_sets = relationship("QuestionSet", back_populates="owner")
     attempts = relationship("ExamAttempt", back_populates="user")
+    generation_jobs = relationship("GenerationJob", back_populates="owner")
 
 class Chapter(Base):
     __tablename__ = "chapters"
@@ -23,10 +24,19 @@ class Chapter(Base):
     content_text = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    status = Column(String, default="ready") # pending, processing, ready, failed
+    content_hash = Column(String, index=True) # sha256 of the uploaded file
+    source_filename = Column(String)
+    error = Column(Text, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True) # Refreshed by the process holding a pending or processing chapter
 
     owner = relationship("User", back_populates="chapters")
     question_sets = relationship("QuestionSet", back_populates="chapter")
 
+    __table_args__ = (
+        Index("ix_chapters_owner_id_created_at", "owner_id", "created_at"),
+    )
+
 class QuestionSet(Base):
     __tablename__ = "question_sets"
 
@@ -44,6 +54,10 @@ class QuestionSet(Base):
     questions = relationship("Question", back_populates="question_set")
     attempts = relationship("ExamAttempt", back_populates="question_set")
 
+    __table_args__ = (
+        Index("ix_question_sets_owner_id_created_at", "owner_id", "created_at"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
 
@@ -53,7 +67,7 @@ class Question(Base):
     options = Column(Text, nullable=True) # JSON string for MCQs
     correct_answer = Column(Text)
     difficulty = Column(String) # EASY, MEDIUM, HARD
-    question_set_id = Column(Integer, ForeignKey("question_sets.id"))
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"), index=True)
 
     question_set = relationship("QuestionSet", back_populates="questions")
 
@@ -70,3 +84,78 @@ class ExamAttempt(Base):
 
     user = relationship("User", back_populates="attempts")
     question_set = relationship("QuestionSet", back_populates="attempts")
+
+    __table_args__ = (
+        Index("ix_exam_attempts_user_id_completed_at", "user_id", "completed_at"),
+    )
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    # Maintained by services/stats.py in the same transaction as each attempt
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True)
+    attempt_count = Column(Integer, default=0)
+    question_sets_attempted = Column(Integer, default=0)
+    total_score = Column(Integer, default=0) # Sum of scores over all attempts
+    total_questions = Column(Integer, default=0) # Sum of questions over all attempts
+    last_attempt_at = Column(DateTime, nullable=True)
+
+class QuestionSetStats(Base):
+    __tablename__ = "question_set_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"))
+    attempt_count = Column(Integer, default=0)
+    best_score = Column(Integer, default=0)
+    last_score = Column(Integer, default=0)
+    total_score = Column(Integer, default=0) # Sum of scores, for the average
+    total_questions = Column(Integer, default=0) # Questions in the latest attempt
+    error_counts = Column(Text, default="{}") # JSON string of {question_id: times answered wrong}
+    last_attempt_id = Column(Integer, ForeignKey("exam_attempts.id"), nullable=True)
+    last_attempt_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_set_id", name="uq_question_set_stats_user_id_question_set_id"),
+    )
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    chapter_id = Column(Integer, ForeignKey("chapters.id"))
+    status = Column(String, default="queued", index=True) # queued, running, completed, failed
+    params = Column(Text) # JSON string of generation options
+    progress = Column(Integer, default=0) # Questions generated so far
+    total = Column(Integer, default=0) # Questions requested
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    owner = relationship("User", back_populates="generation_jobs")
+    chapter = relationship("Chapter")
+    question_set = relationship("QuestionSet")
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True) # sha256 of text, question kind and slot, difficulty, model, prompt version
+    model = Column(String)
+    payload = Column(Text) # JSON string of one generated question
+    size_bytes = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class PageText(Base):
+    __tablename__ = "page_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_hash = Column(String, unique=True, index=True) # sha256 of the uploader scope and everything the page draws
+    method = Column(String) # TEXT (pypdf text layer) or OCR
+    text = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,40 @@
+"""Keyset (cursor) pagination for newest-first listings.
+
+Rows are ordered by (timestamp desc, id desc). A cursor encodes the last
+row of a page, and the next page starts strictly after it, so every page
+is an index range scan no matter how deep it is.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(query: Query, time_column, id_column, after: Optional[str], limit: int) -> Query:
+    """Order query newest first and restrict it to the page after the cursor."""
+    if after:
+        timestamp, row_id = decode_cursor(after)
+        query = query.filter(or_(time_column < timestamp, and_(time_column == timestamp, id_column < row_id)))
+    return query.order_by(time_column.desc(), id_column.desc()).limit(limit)
+
+def set_next_cursor(response: Response, rows: List, time_attr: str, limit: int):
+    """Advertise the cursor of the next page, if this page was full."""
+    if len(rows) == limit and rows:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, time_attr), last.id)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from .. import schemas, auth
+from ..services import batch_sizing, model_router, rate_limit
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+@router.get("/llm/health")
+def get_llm_health(current_user: schemas.User = Depends(auth.get_current_admin)):
+    """Per-model breaker state, rolling success/latency/JSON-validity stats, rate limit and batch sizing."""
+    rate_limits = rate_limit.limiter.snapshot()
+    batching = batch_sizing.sizer.snapshot()
+    return {
+        "models": {
+            model: {**stats, "rate_limit": rate_limits.get(model), "batching": batching.get(model)}
+            for model, stats in model_router.router.snapshot().items()
+        },
+        "preferences": {difficulty: model_router.router.preferred(difficulty) for difficulty in model_router.router.preferences},
+    }
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from .. import models, database, auth
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload, load_only
+from .. import models, schemas, database, auth, pagination
+from ..services import grading, stats
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import json
 
 router = APIRouter(
@@ -10,41 +11,129 @@ router = APIRouter(
     tags=["attempts"]
 )
 
+# Everything but the answers JSON, which only the attempt detail view needs
+_ATTEMPT_SUMMARY_COLUMNS = (
+    models.ExamAttempt.id, models.ExamAttempt.user_id, models.ExamAttempt.question_set_id,
+    models.ExamAttempt.score, models.ExamAttempt.total_questions, models.ExamAttempt.completed_at,
+)
+
 class AttemptCreate(BaseModel):
     question_set_id: int
-    score: int
-    total_questions: int
+    answers: Dict[str, Any]
+    # Accepted for older clients and ignored; attempts are graded on the server
+    score: Optional[int] = None
+    total_questions: Optional[int] = None
+
+class Submission(BaseModel):
+    question_set_id: int
     answers: Dict[str, Any]
 
+class GradeRequest(BaseModel):
+    submissions: List[Submission]
+
+class RegradeRequest(BaseModel):
+    question_set_id: Optional[int] = None
+    attempt_ids: Optional[List[int]] = None
+
+def _ensure_owned_sets(db: Session, question_set_ids, owner_id: int):
+    question_set_ids = set(question_set_ids)
+    owned = {row[0] for row in db.query(models.QuestionSet.id).filter(models.QuestionSet.id.in_(question_set_ids), models.QuestionSet.owner_id == owner_id).all()}
+    if owned != question_set_ids:
+        raise HTTPException(status_code=404, detail="Question Set not found")
+
 @router.post("/")
 def create_attempt(
     attempt: AttemptCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
+    _ensure_owned_sets(db, [attempt.question_set_id], current_user.id)
+    score, total_questions, results = grading.grade(db, attempt.question_set_id, attempt.answers)
     db_attempt = models.ExamAttempt(
         user_id=current_user.id,
         question_set_id=attempt.question_set_id,
-        score=attempt.score,
-        total_questions=attempt.total_questions,
+        score=score,
+        total_questions=total_questions,
         answers=json.dumps(attempt.answers)
     )
     db.add(db_attempt)
+    db.flush()
+    stats.record_attempt(db, db_attempt, results)
     db.commit()
     db.refresh(db_attempt)
     return db_attempt
 
-@router.get("/user/")
+@router.post("/grade")
+def grade_submissions(
+    request: GradeRequest,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Grade many answer sheets without storing them."""
+    _ensure_owned_sets(db, [s.question_set_id for s in request.submissions], current_user.id)
+    graded = grading.grade_many(db, [(s.question_set_id, s.answers) for s in request.submissions])
+    return [
+        {"question_set_id": s.question_set_id, "score": score, "total_questions": total, "results": results}
+        for s, (score, total, results) in zip(request.submissions, graded)
+    ]
+
+@router.post("/regrade")
+def regrade_attempts(
+    request: RegradeRequest,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Re-score stored attempts on the caller's question sets against their current answer keys."""
+    query = db.query(
+        models.ExamAttempt.id, models.ExamAttempt.user_id, models.ExamAttempt.question_set_id, models.ExamAttempt.answers,
+        models.ExamAttempt.score, models.ExamAttempt.total_questions,
+    ).join(models.QuestionSet, models.ExamAttempt.question_set_id == models.QuestionSet.id).filter(models.QuestionSet.owner_id == current_user.id)
+    if request.question_set_id is not None:
+        query = query.filter(models.ExamAttempt.question_set_id == request.question_set_id)
+    if request.attempt_ids is not None:
+        query = query.filter(models.ExamAttempt.id.in_(request.attempt_ids))
+    rows = query.all()
+
+    graded = grading.grade_many(db, [(row.question_set_id, json.loads(row.answers or "{}")) for row in rows])
+    changed = [
+        {"id": row.id, "score": score, "total_questions": total}
+        for row, (score, total, _) in zip(rows, graded)
+        if (score, total) != (row.score, row.total_questions)
+    ]
+    if changed:
+        db.bulk_update_mappings(models.ExamAttempt, changed)
+    # Error counts depend on the answer key, so refresh stats even when no score moved
+    stats.rebuild(db, {row.user_id for row in rows})
+    db.commit()
+    return {"regraded": len(rows), "changed": len(changed)}
+
+@router.get("/user/", response_model=List[schemas.AttemptSummary])
 def get_user_attempts(
-    current_user: models.User = Depends(auth.get_current_user),
+    response: Response,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    # Pass the X-Next-Cursor response header back as ?after= for the next page
+    query = db.query(models.ExamAttempt).options(load_only(*_ATTEMPT_SUMMARY_COLUMNS)).filter(models.ExamAttempt.user_id == current_user.id)
+    attempts = pagination.keyset_page(query, models.ExamAttempt.completed_at, models.ExamAttempt.id, after, limit).all()
+    pagination.set_next_cursor(response, attempts, "completed_at", limit)
+    return attempts
+
+@router.get("/stats")
+def get_attempt_stats(
+    question_set_id: Optional[int] = None,
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    return db.query(models.ExamAttempt).filter(models.ExamAttempt.user_id == current_user.id).order_by(models.ExamAttempt.completed_at.desc()).all()
+    """Progress summary from the stats tables; cost does not grow with attempt history."""
+    return stats.summary(db, current_user.id, question_set_id)
 
 @router.get("/{attempt_id}")
 def get_attempt(
     attempt_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     attempt = db.query(models.ExamAttempt).options(joinedload(models.ExamAttempt.question_set).joinedload(models.QuestionSet.questions)).filter(models.ExamAttempt.id == attempt_id).first()
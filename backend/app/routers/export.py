@@ -1,34 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse, PlainTextResponse
-from sqlalchemy.orm import Session
-from .. import models, database, auth
-from ..services import export
-import io
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from .. import models, schemas, database, auth
+from ..services import bulk_export, export, export_cache
+from pydantic import BaseModel
+from typing import BinaryIO, Iterator, List, Optional
+from urllib.parse import quote
+import os
 
 router = APIRouter(
     tags=["export"]
 )
 
+class BulkExportRequest(BaseModel):
+    question_set_ids: Optional[List[int]] = None # All of the user's sets when omitted
+    format: str = "pdf"
+    include_answers: bool = False
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison
+    if not if_none_match:
+        return False
+    candidates = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+def _iter_file(file: BinaryIO) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = file.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+def _attachment(filename: str) -> str:
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+@router.post("/export/bulk")
+def export_bulk(
+    request: BulkExportRequest,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    if request.format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format")
+
+    query = db.query(models.QuestionSet.id, models.QuestionSet.title).filter(models.QuestionSet.owner_id == current_user.id)
+    if request.question_set_ids is not None:
+        query = query.filter(models.QuestionSet.id.in_(request.question_set_ids))
+    question_sets = [tuple(row) for row in query.order_by(models.QuestionSet.created_at.desc(), models.QuestionSet.id.desc()).all()]
+    if not question_sets:
+        raise HTTPException(status_code=404, detail="No question sets found")
+
+    return StreamingResponse(
+        bulk_export.iter_zip(question_sets, request.format, request.include_answers),
+        media_type="application/zip",
+        headers={"Content-Disposition": _attachment(f"question_sets_{request.format}.zip")},
+    )
+
 @router.get("/export/{question_set_id}/{format}")
 def export_questions(
     question_set_id: int,
     format: str,
     include_answers: bool = Query(False),
-    current_user: models.User = Depends(auth.get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     qs = db.query(models.QuestionSet).filter(models.QuestionSet.id == question_set_id, models.QuestionSet.owner_id == current_user.id).first()
     if not qs:
         raise HTTPException(status_code=404, detail="Question Set not found")
-        
-    if format == "pdf":
-        buffer = export.generate_pdf(qs, include_answers)
-        return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={qs.title}.pdf"})
-    elif format == "docx":
-        buffer = export.generate_docx(qs, include_answers)
-        return StreamingResponse(buffer, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document", headers={"Content-Disposition": f"attachment; filename={qs.title}.docx"})
-    elif format == "txt":
-        text = export.generate_text(qs, include_answers)
-        return PlainTextResponse(text, headers={"Content-Disposition": f"attachment; filename={qs.title}.txt"})
-    else:
+    if format not in export.FORMATS:
         raise HTTPException(status_code=400, detail="Invalid format")
+
+    # The key changes whenever the set's questions do. It is a weak validator: a re-render after
+    # eviction has the same content but not always the same bytes (DOCX embeds timestamps).
+    key = export_cache.current_key(db, qs.id, format, include_answers)
+    headers = {"ETag": f'W/"{key}"', "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    media_type, _ = export.FORMATS[format]
+    filename = f"{qs.title}.{format}"
+    file = export_cache.open_cached(key, format)
+    if file is None and format == "txt":
+        # Stream text as it is produced, keeping a copy for the next download
+        qs = db.query(models.QuestionSet).options(joinedload(models.QuestionSet.questions)).filter(models.QuestionSet.id == qs.id).first()
+        chunks = (chunk.encode("utf-8") for chunk in export.iter_text(qs, include_answers))
+        headers["Content-Disposition"] = _attachment(filename)
+        return StreamingResponse(export_cache.tee(key, format, chunks), media_type=media_type, headers=headers)
+
+    # Opened before responding, so eviction can no longer remove the file under the response
+    file = file or export_cache.open_rendered(db, qs.id, format, include_answers, key)
+    headers["Content-Disposition"] = _attachment(filename)
+    headers["Content-Length"] = str(os.fstat(file.fileno()).st_size)
+    return StreamingResponse(_iter_file(file), media_type=media_type, headers=headers)
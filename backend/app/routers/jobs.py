@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from .. import models, schemas, database, auth
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"]
+)
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: int,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    job = db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id, models.GenerationJob.owner_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.id,
+        "chapter_id": job.chapter_id,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "question_set_id": job.question_set_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
@@ -1,105 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from .. import models, database, auth
-from ..services import llm
+from .. import models, schemas, database, auth, pagination
+from ..services import export_cache, jobs, llm, question_store
+import asyncio
+from typing import List, Optional
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     tags=["questions"]
 )
 
 @router.post("/generate/{chapter_id}")
-async def generate_questions_for_chapter(
+def generate_questions_for_chapter(
     chapter_id: int,
     num_mcqs: int = 5,
     num_short: int = 3,
     num_flashcards: int = 0,
     is_exam: bool = False,
     difficulty: str = "Medium",
-    current_user: models.User = Depends(auth.get_current_user),
+    fresh: bool = False,
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     chapter = db.query(models.Chapter).filter(models.Chapter.id == chapter_id, models.Chapter.owner_id == current_user.id).first()
     if not chapter:
         raise HTTPException(status_code=404, detail="Chapter not found")
-    
+    _ensure_ready(chapter)
+
+    params = _generation_params(num_mcqs, num_short, num_flashcards, is_exam, difficulty, fresh)
+    job = jobs.create_job(db, current_user.id, chapter.id, params)
+    jobs.submit(job.id)
+    return {"message": "Question generation queued", "job_id": job.id, "status": job.status}
+
+@router.get("/generate/{chapter_id}/stream")
+def stream_questions_for_chapter(
+    chapter_id: int,
+    num_mcqs: int = 5,
+    num_short: int = 3,
+    num_flashcards: int = 0,
+    is_exam: bool = False,
+    difficulty: str = "Medium",
+    fresh: bool = False,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Server-sent events variant of /generate.
+
+    Emits a `start` event, one `batch` event per LLM batch (saved before it is
+    sent, with the question_set_id it was saved to), then `done`. The set is
+    created with the first batch that has questions. If generation fails,
+    produces nothing, or the client disconnects first, the partial set is
+    deleted and `error` is sent instead of `done` (when the client is still
+    there to receive it).
+    """
+    chapter = db.query(models.Chapter).filter(models.Chapter.id == chapter_id, models.Chapter.owner_id == current_user.id).first()
+    if not chapter:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    _ensure_ready(chapter)
+
+    params = _generation_params(num_mcqs, num_short, num_flashcards, is_exam, difficulty, fresh)
+    owner_id = current_user.id
+    text = chapter.content_text
+
+    async def events():
+        total = params["num_mcqs"] + params["num_short"] + params["num_flashcards"]
+        question_set_id = None
+        finished = False
+        yield _sse("start", {"total": total})
+        try:
+            async for batch in llm.iter_question_batches(text, params["num_mcqs"], params["num_short"], params["num_flashcards"], difficulty, use_cache=not fresh):
+                if any(batch[key] for key in llm.QUESTION_KEYS):
+                    if question_set_id is None:
+                        question_set_id = await asyncio.to_thread(_create_set, chapter, owner_id, params, batch)
+                    else:
+                        await asyncio.to_thread(_save_batch, question_set_id, batch, difficulty)
+                yield _sse("batch", {**batch, "question_set_id": question_set_id})
+            if question_set_id is None:
+                yield _sse("error", {"detail": "LLM Generation failed: no questions were generated"})
+                return
+            finished = True
+        except Exception as e:
+            logger.exception("Streaming generation failed: %s", e)
+            yield _sse("error", {"detail": f"LLM Generation failed: {str(e)}"})
+            return
+        finally:
+            # Also runs when the client disconnects mid-stream
+            if not finished and question_set_id is not None:
+                _delete_set(question_set_id)
+        export_cache.prewarm(question_set_id)
+        yield _sse("done", {"question_set_id": question_set_id})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _ensure_ready(chapter: models.Chapter):
+    if chapter.status in ("pending", "processing"):
+        raise HTTPException(status_code=409, detail="Chapter is still being processed")
+    if chapter.status == "failed":
+        raise HTTPException(status_code=409, detail=chapter.error or "Chapter processing failed")
+
+def _generation_params(num_mcqs: int, num_short: int, num_flashcards: int, is_exam: bool, difficulty: str, fresh: bool) -> dict:
+    if is_exam:
+        num_short = 0
+        num_flashcards = 0
+
+    return {
+        "num_mcqs": num_mcqs,
+        "num_short": num_short,
+        "num_flashcards": num_flashcards,
+        "is_exam": is_exam,
+        "difficulty": difficulty,
+        "fresh": fresh,
+    }
+
+def _create_set(chapter: models.Chapter, owner_id: int, params: dict, batch: dict) -> int:
+    db = database.SessionLocal()
+    try:
+        return question_store.create_question_set(db, chapter, owner_id, params, batch).id
+    finally:
+        db.close()
+
+def _delete_set(question_set_id: int):
+    db = database.SessionLocal()
     try:
-        if is_exam:
-            num_short = 0
-            num_flashcards = 0
-            
-        generated_data = llm.generate_questions(chapter.content_text, num_mcqs, num_short, num_flashcards, difficulty)
-        
-        # Validate counts
-        gen_mcqs = len(generated_data.get("mcqs", []))
-        gen_short = len(generated_data.get("short_questions", []))
-        gen_flash = len(generated_data.get("flashcards", []))
-        
-        print(f"DEBUG: Requested - MCQs: {num_mcqs}, Short: {num_short}, Flashcards: {num_flashcards}")
-        print(f"DEBUG: Generated - MCQs: {gen_mcqs}, Short: {gen_short}, Flashcards: {gen_flash}")
-        
-        print(f"DEBUG: Generated Data: {generated_data}")
+        question_store.delete_question_set(db, question_set_id)
     except Exception as e:
-        print(f"ERROR: Generation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"LLM Generation failed: {str(e)}")
-    
-    # Save Question Set
-    time_limit = int(num_mcqs / 2) if is_exam else None
-    is_flashcard = num_flashcards > 0 and num_mcqs == 0 and num_short == 0
-    
-    question_set = models.QuestionSet(
-        title=f"Exam: {chapter.title}" if is_exam else f"Flashcards: {chapter.title}" if is_flashcard else f"Questions for {chapter.title}",
-        owner_id=current_user.id,
-        chapter_id=chapter.id,
-        is_exam=is_exam,
-        is_flashcard=is_flashcard,
-        time_limit=time_limit
-    )
-    db.add(question_set)
-    db.commit()
-    db.refresh(question_set)
-    
-    # Save Questions
-    for mcq in generated_data.get("mcqs", []):
-        q = models.Question(
-            question_text=mcq["question"],
-            question_type="MCQ",
-            options=json.dumps(mcq["options"]),
-            correct_answer=mcq["correct_answer"],
-            difficulty=difficulty,
-            question_set_id=question_set.id
-        )
-        db.add(q)
-        
-    for short in generated_data.get("short_questions", []):
-        q = models.Question(
-            question_text=short["question"],
-            question_type="SHORT",
-            correct_answer=short["answer"],
-            difficulty=difficulty,
-            question_set_id=question_set.id
-        )
-        db.add(q)
-
-    for flashcard in generated_data.get("flashcards", []):
-        q = models.Question(
-            question_text=flashcard["front"],
-            question_type="FLASHCARD",
-            correct_answer=flashcard["back"],
-            difficulty=difficulty,
-            question_set_id=question_set.id
-        )
-        db.add(q)
-        
-    db.commit()
-    return {"message": "Questions generated successfully", "question_set_id": question_set.id}
+        logger.exception("Could not delete partial question set %d: %s", question_set_id, e)
+    finally:
+        db.close()
+
+def _save_batch(question_set_id: int, batch: dict, difficulty: str):
+    db = database.SessionLocal()
+    try:
+        question_store.add_questions(db, question_set_id, batch, difficulty)
+    finally:
+        db.close()
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @router.get("/questionsets/{question_set_id}")
 def get_question_set(
     question_set_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     qs = db.query(models.QuestionSet).options(joinedload(models.QuestionSet.questions)).filter(models.QuestionSet.id == question_set_id, models.QuestionSet.owner_id == current_user.id).first()
@@ -107,11 +153,17 @@ def get_question_set(
         raise HTTPException(status_code=404, detail="Question Set not found")
     return qs
 
-@router.get("/questionsets/")
+@router.get("/questionsets/", response_model=List[schemas.QuestionSetSummary])
 def get_question_sets(
+    response: Response,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 10,
-    current_user: models.User = Depends(auth.get_current_user),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    return db.query(models.QuestionSet).filter(models.QuestionSet.owner_id == current_user.id).order_by(models.QuestionSet.created_at.desc()).offset(skip).limit(limit).all()
+    # Pass the X-Next-Cursor response header back as ?after= for the next page; skip is kept for old clients
+    query = db.query(models.QuestionSet).filter(models.QuestionSet.owner_id == current_user.id)
+    question_sets = pagination.keyset_page(query, models.QuestionSet.created_at, models.QuestionSet.id, after, limit).offset(skip).all()
+    pagination.set_next_cursor(response, question_sets, "created_at", limit)
+    return question_sets
@@ -1,40 +1,59 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import models, database, auth
-from ..services import ocr
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, load_only
+from .. import models, schemas, database, auth, pagination
+from ..services import ingest
+from typing import List, Optional
 
 router = APIRouter(
     tags=["upload"]
 )
 
-@router.post("/upload/chapter")
+# Everything but content_text, which can be megabytes of OCR output
+_CHAPTER_SUMMARY_COLUMNS = (
+    models.Chapter.id, models.Chapter.title, models.Chapter.created_at, models.Chapter.owner_id,
+    models.Chapter.status, models.Chapter.source_filename, models.Chapter.error,
+)
+
+@router.post("/upload/chapter", response_model=schemas.ChapterSummary)
 async def upload_chapter(
     title: str,
     file: UploadFile = File(...),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    content = await file.read()
     try:
-        text = ocr.extract_text(content, file.filename)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
-    
-    chapter = models.Chapter(
-        title=title,
-        content_text=text,
-        owner_id=current_user.id
-    )
-    db.add(chapter)
-    db.commit()
-    db.refresh(chapter)
+        content_hash, _ = await ingest.spool_upload(file)
+    except ingest.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Text extraction happens in the background; poll GET /chapters/{id} until status is "ready"
+    chapter = ingest.create_chapter(db, title, current_user.id, content_hash, file.filename)
+    if chapter.status == "pending":
+        ingest.submit(chapter.id)
     return chapter
 
-@router.get("/chapters/")
+@router.get("/chapters/", response_model=List[schemas.ChapterSummary])
 def get_chapters(
+    response: Response,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 10,
-    current_user: models.User = Depends(auth.get_current_user),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    return db.query(models.Chapter).filter(models.Chapter.owner_id == current_user.id).order_by(models.Chapter.created_at.desc()).offset(skip).limit(limit).all()
+    # Pass the X-Next-Cursor response header back as ?after= for the next page; skip is kept for old clients
+    query = db.query(models.Chapter).options(load_only(*_CHAPTER_SUMMARY_COLUMNS)).filter(models.Chapter.owner_id == current_user.id)
+    chapters = pagination.keyset_page(query, models.Chapter.created_at, models.Chapter.id, after, limit).offset(skip).all()
+    pagination.set_next_cursor(response, chapters, "created_at", limit)
+    return chapters
+
+@router.get("/chapters/{chapter_id}")
+def get_chapter(
+    chapter_id: int,
+    current_user: schemas.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    chapter = db.query(models.Chapter).filter(models.Chapter.id == chapter_id, models.Chapter.owner_id == current_user.id).first()
+    if not chapter:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    return chapter
@@ -21,3 +21,42 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+
+# List views: small columns only. Chapter text, questions and attempt answers
+# come from the detail endpoints.
+
+class ChapterSummary(BaseModel):
+    id: int
+    title: Optional[str] = None
+    created_at: Optional[datetime] = None
+    owner_id: Optional[int] = None
+    status: Optional[str] = None
+    source_filename: Optional[str] = None
+    error: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class QuestionSetSummary(BaseModel):
+    id: int
+    title: Optional[str] = None
+    created_at: Optional[datetime] = None
+    owner_id: Optional[int] = None
+    chapter_id: Optional[int] = None
+    time_limit: Optional[int] = None
+    is_exam: Optional[bool] = None
+    is_flashcard: Optional[bool] = None
+
+    class Config:
+        orm_mode = True
+
+class AttemptSummary(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    question_set_id: Optional[int] = None
+    score: Optional[int] = None
+    total_questions: Optional[int] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
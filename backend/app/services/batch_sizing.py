@@ -0,0 +1,95 @@
+"""Per-model batch sizes that adapt to how the model actually responds.
+
+Every prompt carries the whole section text, so larger batches spend fewer
+prompt tokens per question and get more questions out of the tokens/min
+quota. They also take longer and risk truncated output. Each model's size
+grows by one after a clean batch, up to what fits in its completion token
+budget at the observed tokens per question. It halves after a truncated or
+unparseable response, and shrinks by one when batches run slower than the
+target.
+"""
+from typing import Optional
+import os
+import threading
+
+INITIAL_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))
+MIN_BATCH_SIZE = int(os.getenv("LLM_MIN_BATCH_SIZE", "2"))
+MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "25"))
+TARGET_BATCH_SECONDS = float(os.getenv("LLM_TARGET_BATCH_SECONDS", "20"))
+
+# Sent as max_tokens on every completion; batches are sized to fit inside it
+MAX_COMPLETION_TOKENS = int(os.getenv("LLM_MAX_COMPLETION_TOKENS", "4096"))
+
+# Exponential moving average weight for new observations
+SMOOTHING = 0.3
+INITIAL_TOKENS_PER_QUESTION = 120.0
+
+class ModelBatchSizer:
+    def __init__(self, initial_size: int):
+        self.size = initial_size
+        self.tokens_per_question = INITIAL_TOKENS_PER_QUESTION
+        self.seconds_per_batch = None
+        self.truncation_rate = 0.0
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def _token_cap(self) -> int:
+        # Leave headroom so an above-average batch still fits
+        return max(MIN_BATCH_SIZE, int(MAX_COMPLETION_TOKENS * 0.8 / self.tokens_per_question))
+
+    def record(self, requested: int, completion_tokens: Optional[int], seconds: float, truncated: bool):
+        with self._lock:
+            self.batches += 1
+            self.truncation_rate += SMOOTHING * ((1.0 if truncated else 0.0) - self.truncation_rate)
+            if truncated:
+                self.size = max(MIN_BATCH_SIZE, self.size // 2)
+                return
+            if completion_tokens and requested:
+                self.tokens_per_question += SMOOTHING * (completion_tokens / requested - self.tokens_per_question)
+            self.seconds_per_batch = seconds if self.seconds_per_batch is None else self.seconds_per_batch + SMOOTHING * (seconds - self.seconds_per_batch)
+
+            if self.seconds_per_batch > TARGET_BATCH_SECONDS:
+                size = self.size - 1
+            elif requested >= self.size:
+                # Only grow once a full-size batch has succeeded
+                size = self.size + 1
+            else:
+                size = self.size
+            self.size = max(MIN_BATCH_SIZE, min(size, MAX_BATCH_SIZE, self._token_cap()))
+
+    def expected_completion_tokens(self, questions: int) -> int:
+        with self._lock:
+            return int(questions * self.tokens_per_question)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "batch_size": self.size,
+                "tokens_per_question": round(self.tokens_per_question, 1),
+                "seconds_per_batch": round(self.seconds_per_batch, 2) if self.seconds_per_batch is not None else None,
+                "truncation_rate": round(self.truncation_rate, 3),
+                "batches": self.batches,
+            }
+
+class BatchSizer:
+    def __init__(self, initial_size: int):
+        self.initial_size = initial_size
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model: str) -> ModelBatchSizer:
+        with self._lock:
+            sizer = self._models.get(model)
+            if sizer is None:
+                sizer = self._models[model] = ModelBatchSizer(self.initial_size)
+            return sizer
+
+    def size(self, model: str) -> int:
+        return self.model(model).size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = dict(self._models)
+        return {model: sizer.snapshot() for model, sizer in models.items()}
+
+sizer = BatchSizer(INITIAL_BATCH_SIZE)
@@ -0,0 +1,99 @@
+"""Export many question sets as one streamed ZIP.
+
+Sets are rendered in a process pool, at most EXPORT_WINDOW at a time, and
+each finished file is written to the archive and flushed to the client
+before the next one is collected. Peak memory depends on the window, not on
+the number of sets. Renders already in the export cache are reused, and new
+ones are added to it.
+"""
+from collections import deque
+from types import SimpleNamespace
+from typing import Iterator, List, Tuple
+import os
+import re
+import zipfile
+
+from sqlalchemy.orm import Session
+from .. import models, database, metrics
+from . import export, export_cache
+from .process_pool import SpawnPool
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+EXPORT_WINDOW = int(os.getenv("EXPORT_WINDOW", str(EXPORT_WORKERS * 2)))
+
+_pool = SpawnPool(EXPORT_WORKERS)
+
+def snapshot(db: Session, question_set_id: int, title: str) -> SimpleNamespace:
+    """Plain, picklable copy of a set with just the columns the renderers read."""
+    rows = db.query(
+        models.Question.question_text, models.Question.question_type, models.Question.options, models.Question.correct_answer
+    ).filter(models.Question.question_set_id == question_set_id).order_by(models.Question.id).all()
+    questions = [
+        SimpleNamespace(question_text=text, question_type=question_type, options=options, correct_answer=answer)
+        for text, question_type, options, answer in rows
+    ]
+    return SimpleNamespace(title=title, questions=questions)
+
+def entry_name(question_set_id: int, title: str, format: str) -> str:
+    safe_title = re.sub(r"[^\w\- ]+", "_", title or "").strip() or "Untitled"
+    return f"{question_set_id} - {safe_title}.{format}"
+
+class _ZipSink:
+    """Write-only file object; zipfile falls back to data descriptors when it cannot seek."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _rendered(db: Session, question_sets: List[Tuple[int, str]], format: str, include_answers: bool) -> Iterator[Tuple[str, bytes]]:
+    """Yield (entry name, file contents) in input order, keeping the pool busy."""
+    pool = _pool.get()
+    pending = deque()
+
+    def collect():
+        name, key, future, content = pending.popleft()
+        if future is not None:
+            content, seconds = future.result()
+            metrics.EXPORT_RENDER_SECONDS.observe(seconds, format=format)
+            export_cache.put(key, format, content)
+        return name, content
+
+    for question_set_id, title in question_sets:
+        key = export_cache.current_key(db, question_set_id, format, include_answers)
+        name = entry_name(question_set_id, title, format)
+        content = export_cache.read(key, format)
+        if content is not None:
+            pending.append((name, key, None, content))
+        else:
+            future = pool.submit(export.render_bytes, snapshot(db, question_set_id, title), format, include_answers)
+            pending.append((name, key, future, None))
+        while len(pending) >= EXPORT_WINDOW:
+            yield collect()
+    while pending:
+        yield collect()
+
+def iter_zip(question_sets: List[Tuple[int, str]], format: str, include_answers: bool) -> Iterator[bytes]:
+    """Stream a ZIP of the given (question_set_id, title) pairs rendered as format."""
+    compression = zipfile.ZIP_DEFLATED if format == "txt" else zipfile.ZIP_STORED # PDF and DOCX are already compressed
+    sink = _ZipSink()
+    db = database.SessionLocal()
+    try:
+        with zipfile.ZipFile(sink, "w", compression=compression) as archive:
+            for name, content in _rendered(db, question_sets, format, include_answers):
+                archive.writestr(name, content)
+                yield sink.drain()
+        # Central directory, written on close
+        yield sink.drain()
+    finally:
+        db.close()
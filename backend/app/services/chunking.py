@@ -0,0 +1,73 @@
+from typing import List
+import os
+import re
+
+# Rough size of a token for the Llama tokenizers on English prose.
+CHARS_PER_TOKEN = 4
+
+# Upper bound on the text sent with a single batch prompt.
+SECTION_MAX_TOKENS = int(os.getenv("SECTION_MAX_TOKENS", "3000"))
+
+_PARAGRAPH_BREAK = re.compile(r"\f|\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+def _split_oversized(paragraph: str, max_chars: int) -> List[str]:
+    """Break a paragraph longer than max_chars at sentence ends, hard-cutting as a last resort."""
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_sections(text: str, max_tokens: int = SECTION_MAX_TOKENS) -> List[str]:
+    """Split text into sections of at most max_tokens, at page or paragraph boundaries.
+
+    Consecutive paragraphs are packed together until the next one would
+    overflow the section.
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    sections = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        for piece in (_split_oversized(paragraph, max_chars) if len(paragraph) > max_chars else [paragraph]):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                sections.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        sections.append(current)
+    return sections or [""]
+
+def allocate(total: int, weights: List[int]) -> List[int]:
+    """Split total across weights proportionally (largest remainder method)."""
+    weight_sum = sum(weights)
+    if total <= 0 or not weights:
+        return [0] * len(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+    exact = [total * w / weight_sum for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in by_remainder[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
@@ -0,0 +1,82 @@
+"""Near-duplicate detection for generated questions.
+
+Each question is reduced to word shingles and a MinHash signature. The
+signature is split into LSH bands, so a new question is only compared
+against earlier questions that share at least one band, and the
+comparison is the signature agreement, an estimate of shingle Jaccard
+similarity. Adding a question is O(signature size), independent of how
+many questions are already indexed.
+"""
+from collections import defaultdict
+from typing import List, Set
+import hashlib
+import os
+import random
+import re
+import struct
+
+# Estimated Jaccard similarity at or above which two questions are duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16 # 16 bands of 4 rows: pairs around 0.5 similarity or more become candidates
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+")
+
+# Words that make questions look different without changing what they ask
+_STOPWORDS = frozenset("a an the of to in on for and or is are was were be by with what which who whom how why when where does do did".split())
+
+def shingles(text: str) -> Set[str]:
+    words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def signature(shingle_set: Set[str]) -> List[int]:
+    hashes = [struct.unpack("<I", hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest())[0] for s in shingle_set]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+class QuestionIndex:
+    """MinHash/LSH index of the questions accepted so far for one generation."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._signatures = []
+        self._buckets = defaultdict(list)
+        self._exact = set()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def add(self, text: str) -> bool:
+        """Index text and return True, or return False if it duplicates an indexed question."""
+        shingle_set = shingles(text)
+        exact = " ".join(sorted(shingle_set))
+        if exact in self._exact:
+            return False
+        if not shingle_set:
+            self._exact.add(exact)
+            return True
+
+        sig = signature(shingle_set)
+        bands = [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+        candidates = {n for band in bands for n in self._buckets.get(band, ())}
+        if any(similarity(sig, self._signatures[n]) >= self.threshold for n in candidates):
+            return False
+
+        n = len(self._signatures)
+        self._signatures.append(sig)
+        for band in bands:
+            self._buckets[band].append(n)
+        self._exact.add(exact)
+        return True
@@ -1,80 +1,118 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from docx import Document
+from typing import BinaryIO, Iterator, Tuple
 import io
-from .. import models
+import json
+import time
+from .. import metrics, models
 
-def generate_pdf(question_set: models.QuestionSet, include_answers: bool = False) -> io.BytesIO:
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
+# reportlab and python-docx are imported inside the writers that use them;
+# both are slow to import and only needed once something is exported.
+
+def write_pdf(question_set: models.QuestionSet, include_answers: bool, out: BinaryIO):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    # invariant: no creation timestamp or random document ID, so the same set renders to the same bytes
+    p = canvas.Canvas(out, pagesize=letter, invariant=1)
     width, height = letter
     y = height - 50
-    
+
     p.setFont("Helvetica-Bold", 16)
     p.drawString(50, y, question_set.title)
     y -= 30
-    
+
     p.setFont("Helvetica", 12)
-    
+
     for i, q in enumerate(question_set.questions, 1):
         if y < 50:
             p.showPage()
             y = height - 50
             p.setFont("Helvetica", 12)
-            
+
         p.drawString(50, y, f"{i}. {q.question_text}")
         y -= 20
-        
+
         if q.question_type == "MCQ":
-            import json
             options = json.loads(q.options)
             for opt in options:
                 p.drawString(70, y, f"- {opt}")
                 y -= 15
-        
+
         if include_answers:
             p.setFont("Helvetica-Oblique", 10)
             p.drawString(70, y, f"Answer: {q.correct_answer}")
             p.setFont("Helvetica", 12)
             y -= 20
-            
+
         y -= 10
-        
+
     p.save()
-    buffer.seek(0)
-    return buffer
 
-def generate_docx(question_set: models.QuestionSet, include_answers: bool = False) -> io.BytesIO:
+def write_docx(question_set: models.QuestionSet, include_answers: bool, out: BinaryIO):
+    from docx import Document
+
     doc = Document()
     doc.add_heading(question_set.title, 0)
-    
+
     for i, q in enumerate(question_set.questions, 1):
         doc.add_paragraph(f"{i}. {q.question_text}", style='List Number')
-        
+
         if q.question_type == "MCQ":
-            import json
             options = json.loads(q.options)
             for opt in options:
                 doc.add_paragraph(opt, style='List Bullet')
-        
+
         if include_answers:
             doc.add_paragraph(f"Answer: {q.correct_answer}", style='Intense Quote')
-            
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
 
-def generate_text(question_set: models.QuestionSet, include_answers: bool = False) -> str:
-    text = f"{question_set.title}\n\n"
+    doc.save(out)
+
+def iter_text(question_set: models.QuestionSet, include_answers: bool = False) -> Iterator[str]:
+    """Yield the text export one question at a time."""
+    yield f"{question_set.title}\n\n"
     for i, q in enumerate(question_set.questions, 1):
-        text += f"{i}. {q.question_text}\n"
+        lines = [f"{i}. {q.question_text}\n"]
         if q.question_type == "MCQ":
-            import json
             options = json.loads(q.options)
-            for opt in options:
-                text += f"  - {opt}\n"
+            lines.extend(f"  - {opt}\n" for opt in options)
         if include_answers:
-            text += f"  Answer: {q.correct_answer}\n"
-        text += "\n"
-    return text
+            lines.append(f"  Answer: {q.correct_answer}\n")
+        lines.append("\n")
+        yield "".join(lines)
+
+def write_text(question_set: models.QuestionSet, include_answers: bool, out: BinaryIO):
+    for chunk in iter_text(question_set, include_answers):
+        out.write(chunk.encode("utf-8"))
+
+def generate_pdf(question_set: models.QuestionSet, include_answers: bool = False) -> io.BytesIO:
+    buffer = io.BytesIO()
+    write_pdf(question_set, include_answers, buffer)
+    buffer.seek(0)
+    return buffer
+
+def generate_docx(question_set: models.QuestionSet, include_answers: bool = False) -> io.BytesIO:
+    buffer = io.BytesIO()
+    write_docx(question_set, include_answers, buffer)
+    buffer.seek(0)
+    return buffer
+
+def generate_text(question_set: models.QuestionSet, include_answers: bool = False) -> str:
+    return "".join(iter_text(question_set, include_answers))
+
+# format -> (media type, writer); writers render straight into a binary file object
+FORMATS = {
+    "pdf": ("application/pdf", write_pdf),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", write_docx),
+    "txt": ("text/plain; charset=utf-8", write_text),
+}
+
+def render(question_set: models.QuestionSet, format: str, include_answers: bool, out: BinaryIO):
+    _, writer = FORMATS[format]
+    with metrics.EXPORT_RENDER_SECONDS.time(format=format):
+        writer(question_set, include_answers, out)
+
+def render_bytes(question_set, format: str, include_answers: bool) -> Tuple[bytes, float]:
+    """Render to bytes and time it. Runs in the bulk export process pool on plain snapshots of a set."""
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    render(question_set, format, include_answers, buffer)
+    return buffer.getvalue(), time.perf_counter() - started
@@ -0,0 +1,168 @@
+"""Rendered exports on local disk, evicted least recently used first.
+
+Each artifact is keyed by (question set, content version, format,
+include_answers), so a set that gains questions gets new keys and the old
+files age out. The key doubles as the response ETag.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+import hashlib
+import os
+import tempfile
+import logging
+import threading
+
+from sqlalchemy.orm import joinedload
+from .. import models, database, metrics
+from . import export, question_store
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "./export_cache")
+MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Rendered as soon as a generation job finishes, so the first download is a cache hit
+PREWARM_FORMATS = [f for f in os.getenv("EXPORT_PREWARM_FORMATS", "pdf,docx").split(",") if f in export.FORMATS]
+
+# Bump when the export layout changes so old renders are not served
+RENDER_VERSION = "1"
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-prewarm")
+_evict_lock = threading.Lock()
+
+def make_key(question_set_id: int, version: str, format: str, include_answers: bool) -> str:
+    raw = f"{RENDER_VERSION}|{question_set_id}|{version}|{format}|{int(include_answers)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _path(key: str, format: str) -> str:
+    return os.path.join(EXPORT_CACHE_DIR, f"{key}.{format}")
+
+def get(key: str, format: str) -> Optional[str]:
+    """Return the cached file's path, marking it recently used, or None."""
+    path = _path(key, format)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        metrics.EXPORT_CACHE_LOOKUPS.inc(result="miss")
+        return None
+    metrics.EXPORT_CACHE_LOOKUPS.inc(result="hit")
+    return path
+
+def read(key: str, format: str) -> Optional[bytes]:
+    path = get(key, format)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError: # Evicted since get()
+        return None
+
+def open_cached(key: str, format: str) -> Optional[BinaryIO]:
+    """Open the cached file for reading, or None. An open file survives eviction."""
+    path = get(key, format)
+    if path is None:
+        return None
+    try:
+        return open(path, "rb")
+    except FileNotFoundError: # Evicted since get()
+        return None
+
+def _store(key: str, format: str, write: Callable[[BinaryIO], None]) -> str:
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            write(out)
+    except BaseException:
+        os.unlink(part_path)
+        raise
+    # Atomic, so readers never see a half-written file
+    path = _path(key, format)
+    os.replace(part_path, path)
+    evict(keep=path)
+    return path
+
+def put(key: str, format: str, content: bytes) -> str:
+    return _store(key, format, lambda out: out.write(content))
+
+def get_or_render(key: str, format: str, render: Callable[[BinaryIO], None]) -> str:
+    """Path to the cached file, calling render(out) to write it on a miss."""
+    return get(key, format) or _store(key, format, render)
+
+def tee(key: str, format: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks through to the client while writing them to the cache.
+
+    The file is only kept if the stream runs to the end.
+    """
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix=".part")
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed:
+            path = _path(key, format)
+            os.replace(part_path, path)
+            evict(keep=path)
+        else:
+            os.unlink(part_path)
+
+def evict(keep: Optional[str] = None):
+    """Delete least recently used files until the cache fits in MAX_BYTES."""
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(EXPORT_CACHE_DIR):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= MAX_BYTES:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+def current_key(db, question_set_id: int, format: str, include_answers: bool) -> str:
+    return make_key(question_set_id, question_store.content_version(db, question_set_id), format, include_answers)
+
+def render_cached(db, question_set_id: int, format: str, include_answers: bool, key: Optional[str] = None) -> str:
+    """Path to the current export of a set, rendering it on a miss."""
+    key = key or current_key(db, question_set_id, format, include_answers)
+
+    def render(out: BinaryIO):
+        question_set = db.query(models.QuestionSet).options(joinedload(models.QuestionSet.questions)).filter(models.QuestionSet.id == question_set_id).first()
+        export.render(question_set, format, include_answers, out)
+
+    return get_or_render(key, format, render)
+
+def open_rendered(db, question_set_id: int, format: str, include_answers: bool, key: Optional[str] = None) -> BinaryIO:
+    """Open the current export of a set, rendering it on a miss or if it is evicted before it can be opened."""
+    key = key or current_key(db, question_set_id, format, include_answers)
+    try:
+        return open(render_cached(db, question_set_id, format, include_answers, key), "rb")
+    except FileNotFoundError: # Evicted between rendering and opening; render once more
+        return open(render_cached(db, question_set_id, format, include_answers, key), "rb")
+
+def prewarm(question_set_id: int):
+    if PREWARM_FORMATS:
+        _executor.submit(_prewarm, question_set_id)
+
+def _prewarm(question_set_id: int):
+    db = database.SessionLocal()
+    try:
+        for format in PREWARM_FORMATS:
+            render_cached(db, question_set_id, format, False)
+    except Exception as e:
+        logger.exception("Prewarming exports for question set %d failed: %s", question_set_id, e)
+    finally:
+        db.close()
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from itertools import takewhile
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from .. import models, database
+
+# Eviction limits: entries older than MAX_AGE_DAYS are dropped, then the least
+# recently used entries go until the payloads fit in MAX_BYTES.
+MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MAX_AGE_DAYS = int(os.getenv("GENERATION_CACHE_MAX_AGE_DAYS", "30"))
+
+def text_digest(text: str) -> str:
+    """Hash of the text with whitespace normalized, so re-OCR noise in spacing still hits."""
+    normalized = " ".join((text or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def make_key(digest: str, kind: str, difficulty: str, model: str, prompt_version: str, slot: int) -> str:
+    """Cache key of one generated question.
+
+    Questions are cached one per key: slot numbers the questions of each kind
+    generated for a section within a request. Batch shape is not part of the
+    key, so a request batched differently (the adaptive batch size moved, or
+    it asks for more questions) still reuses what an earlier request cached.
+    """
+    raw = json.dumps([digest, kind, difficulty.lower(), model, prompt_version, slot])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def get_batch(candidates: List[Tuple[str, Dict[str, List[str]]]]) -> Optional[Tuple[str, dict]]:
+    """Return (model, payload) for the candidate model with the most questions cached.
+
+    candidates are (model, {kind: [key per slot]}) in preference order; ties
+    go to the earlier model. The payload holds, per kind, the cached questions
+    from the first slot up to the first one missing, so a batch that grew
+    past what was cached only has to generate the rest. None when nothing is
+    cached.
+    """
+    all_keys = [key for _, keys in candidates for kind_keys in keys.values() for key in kind_keys]
+    db = database.SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=MAX_AGE_DAYS)
+        by_key = {
+            entry.key: entry
+            for entry in db.query(models.GenerationCacheEntry).filter(models.GenerationCacheEntry.key.in_(all_keys)).all()
+            if entry.created_at >= cutoff
+        }
+        best = None
+        for model, keys in candidates:
+            found = {kind: list(takewhile(lambda key: key in by_key, kind_keys)) for kind, kind_keys in keys.items()}
+            count = sum(len(kind_keys) for kind_keys in found.values())
+            if count and (best is None or count > best[0]):
+                best = (count, model, found)
+        if best is None:
+            return None
+
+        _, model, found = best
+        now = datetime.utcnow()
+        payload = {}
+        for kind, kind_keys in found.items():
+            payload[kind] = []
+            for key in kind_keys:
+                entry = by_key[key]
+                entry.hit_count = (entry.hit_count or 0) + 1
+                entry.last_used_at = now
+                payload[kind].append(json.loads(entry.payload))
+        db.commit()
+        return model, payload
+    finally:
+        db.close()
+
+def put_batch(keys: Dict[str, List[str]], model: str, payload: dict):
+    """Store each question of a generated batch under its slot key, keeping the newest result."""
+    items = {key: json.dumps(item) for kind, kind_keys in keys.items() for key, item in zip(kind_keys, payload.get(kind) or [])}
+    if not items:
+        return
+    db = database.SessionLocal()
+    try:
+        for _ in range(2):
+            now = datetime.utcnow()
+            existing = {entry.key: entry for entry in db.query(models.GenerationCacheEntry).filter(models.GenerationCacheEntry.key.in_(list(items))).all()}
+            for key, data in items.items():
+                entry = existing.get(key)
+                if entry is None:
+                    db.add(models.GenerationCacheEntry(key=key, model=model, payload=data, size_bytes=len(data)))
+                else:
+                    entry.model = model
+                    entry.payload = data
+                    entry.size_bytes = len(data)
+                    entry.created_at = now
+                    entry.last_used_at = now
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                # Another worker stored some of the same questions first; the retry updates them
+                db.rollback()
+    finally:
+        db.close()
+
+def evict():
+    db = database.SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=MAX_AGE_DAYS)
+        db.query(models.GenerationCacheEntry).filter(models.GenerationCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+
+        total = db.query(func.coalesce(func.sum(models.GenerationCacheEntry.size_bytes), 0)).scalar()
+        if total <= MAX_BYTES:
+            return
+        stale_ids = []
+        for entry_id, size in db.query(models.GenerationCacheEntry.id, models.GenerationCacheEntry.size_bytes).order_by(models.GenerationCacheEntry.last_used_at).all():
+            if total <= MAX_BYTES:
+                break
+            stale_ids.append(entry_id)
+            total -= size or 0
+        db.query(models.GenerationCacheEntry).filter(models.GenerationCacheEntry.id.in_(stale_ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
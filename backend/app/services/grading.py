@@ -0,0 +1,143 @@
+"""Server-side grading against a cached answer key per question set.
+
+An answer key holds, for every gradable question, the index of the correct
+MCQ option or the normalized short answer. Keys are cached in memory by
+(question_set_id, content version), so a set that gains questions is
+re-keyed automatically and grading an attempt costs one cheap version
+query plus a single pass over the submitted answers.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import re
+import threading
+
+from sqlalchemy.orm import Session
+from .. import models
+from . import question_store
+
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "1024"))
+
+GRADABLE_TYPES = ("MCQ", "SHORT")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize(text: Any) -> str:
+    """Case, punctuation and whitespace-insensitive form of an answer."""
+    text = _PUNCTUATION.sub(" ", str(text).lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+class AnswerKey:
+    """Compact answer key: question id -> (type, expected, {normalized option: index})."""
+
+    __slots__ = ("entries",)
+
+    def __init__(self, entries: Dict[str, Tuple[str, Any, Optional[Dict[str, int]]]]):
+        self.entries = entries
+
+    @classmethod
+    def from_rows(cls, rows) -> "AnswerKey":
+        entries = {}
+        for question_id, question_type, options, correct_answer in rows:
+            if question_type not in GRADABLE_TYPES:
+                continue
+            if question_type == "MCQ":
+                option_list = json.loads(options) if options else []
+                option_index = {normalize(option): i for i, option in enumerate(option_list)}
+                expected = option_index.get(normalize(correct_answer))
+                # Exact option text is what clients send; it skips normalization
+                for i, option in enumerate(option_list):
+                    option_index.setdefault(option, i)
+                letter = str(correct_answer).strip().upper()
+                if expected is None and len(letter) == 1 and "A" <= letter <= "Z":
+                    # Some generations answer with the option letter
+                    expected = ord(letter) - ord("A")
+                entries[str(question_id)] = ("MCQ", expected, option_index)
+            else:
+                entries[str(question_id)] = ("SHORT", normalize(correct_answer), None)
+        return cls(entries)
+
+    @property
+    def total(self) -> int:
+        return len(self.entries)
+
+    def grade(self, answers: Dict[str, Any]) -> Tuple[int, Dict[str, bool]]:
+        """Score submitted answers ({question_id: option text, option index or short answer})."""
+        score = 0
+        results = {}
+        for question_id, (question_type, expected, option_index) in self.entries.items():
+            answer = answers.get(question_id)
+            if answer is None:
+                correct = False
+            elif question_type == "MCQ":
+                if isinstance(answer, int) and not isinstance(answer, bool):
+                    chosen = answer
+                else:
+                    chosen = option_index.get(answer) if isinstance(answer, str) else None
+                    if chosen is None:
+                        chosen = option_index.get(normalize(answer))
+                correct = expected is not None and chosen == expected
+            else:
+                correct = normalize(answer) == expected
+            results[question_id] = correct
+            score += correct
+        return score, results
+
+class AnswerKeyCache:
+    """Thread-safe LRU of answer keys keyed by (question_set_id, content version)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, str]) -> Optional[AnswerKey]:
+        with self._lock:
+            answer_key = self._entries.get(key)
+            if answer_key is not None:
+                self._entries.move_to_end(key)
+            return answer_key
+
+    def put(self, key: Tuple[int, str], answer_key: AnswerKey):
+        with self._lock:
+            self._entries[key] = answer_key
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+answer_keys = AnswerKeyCache(ANSWER_KEY_CACHE_SIZE)
+
+def get_answer_key(db: Session, question_set_id: int) -> AnswerKey:
+    cache_key = (question_set_id, question_store.content_version(db, question_set_id))
+    answer_key = answer_keys.get(cache_key)
+    if answer_key is None:
+        rows = db.query(
+            models.Question.id, models.Question.question_type, models.Question.options, models.Question.correct_answer
+        ).filter(models.Question.question_set_id == question_set_id).all()
+        answer_key = AnswerKey.from_rows(rows)
+        answer_keys.put(cache_key, answer_key)
+    return answer_key
+
+def grade(db: Session, question_set_id: int, answers: Dict[str, Any]) -> Tuple[int, int, Dict[str, bool]]:
+    """Return (score, total_questions, {question_id: correct})."""
+    answer_key = get_answer_key(db, question_set_id)
+    score, results = answer_key.grade({str(k): v for k, v in answers.items()})
+    return score, answer_key.total, results
+
+def grade_many(db: Session, submissions: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, int, Dict[str, bool]]]:
+    """Grade many (question_set_id, answers) pairs, fetching each set's key once."""
+    answer_key_by_set = {}
+    graded = []
+    for question_set_id, answers in submissions:
+        answer_key = answer_key_by_set.get(question_set_id)
+        if answer_key is None:
+            answer_key = answer_key_by_set[question_set_id] = get_answer_key(db, question_set_id)
+        score, results = answer_key.grade({str(k): v for k, v in answers.items()})
+        graded.append((score, answer_key.total, results))
+    return graded
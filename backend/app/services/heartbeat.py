@@ -0,0 +1,86 @@
+"""Keep claimed background work alive and recover work whose process died.
+
+A process registers the rows it has queued or is working on (generation
+jobs, chapters being extracted) with a Tracker. A daemon thread in every
+process refreshes their heartbeat column every HEARTBEAT_SECONDS and then
+runs each tracker's sweep, which puts rows whose heartbeat is older than
+STALE_SECONDS back in the queue. A row left behind by a crashed or
+restarted process is therefore picked up within about STALE_SECONDS by any
+live process, without waiting for another restart.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, List
+import logging
+import os
+import threading
+import time
+
+from .. import database
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "15"))
+# Several missed heartbeats, so a briefly locked database does not hand live work to another process
+STALE_SECONDS = float(os.getenv("WORKER_STALE_SECONDS", "60"))
+
+class Tracker:
+    """Ids of the rows of one table this process holds, and how to recover abandoned ones."""
+
+    def __init__(self, model, column: str, sweep: Callable[[], None]):
+        self.model = model
+        self.column = column
+        self.sweep = sweep
+        self._ids = set()
+        self._lock = threading.Lock()
+
+    def hold(self, row_id: int):
+        with self._lock:
+            self._ids.add(row_id)
+
+    def release(self, row_id: int):
+        with self._lock:
+            self._ids.discard(row_id)
+
+    def beat(self):
+        with self._lock:
+            row_ids = list(self._ids)
+        if not row_ids:
+            return
+        db = database.SessionLocal()
+        try:
+            db.query(self.model).filter(self.model.id.in_(row_ids)).update(
+                {self.column: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+_trackers: List[Tracker] = []
+_thread = None
+_start_lock = threading.Lock()
+
+def register(model, column: str, sweep: Callable[[], None]) -> Tracker:
+    tracker = Tracker(model, column, sweep)
+    _trackers.append(tracker)
+    return tracker
+
+def stale_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+
+def _run():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        for tracker in _trackers:
+            try:
+                tracker.beat()
+                tracker.sweep()
+            except Exception as e:
+                logger.warning("Heartbeat for %s failed: %s", tracker.model.__tablename__, e)
+
+def start():
+    """Start this process's heartbeat thread, once."""
+    global _thread
+    with _start_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="heartbeat", daemon=True)
+            _thread.start()
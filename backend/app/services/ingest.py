@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from fastapi import UploadFile
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from .. import models, database, metrics
+from . import heartbeat, ocr
+
+logger = logging.getLogger(__name__)
+
+# Uploads are spooled here, named by content hash, until text extraction is done.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+
+# Text extraction workers. OCR inside each one fans out to the OCR process pool.
+# A chapter is pending until a worker claims it, then processing until ready or failed.
+MAX_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+
+class UploadTooLarge(Exception):
+    pass
+
+def spool_path(content_hash: str) -> str:
+    return os.path.join(UPLOAD_DIR, content_hash)
+
+async def spool_upload(file: UploadFile) -> Tuple[str, int]:
+    """Copy an upload to disk in chunks, hashing as it streams.
+
+    Returns (sha256 hex digest, size). Raises UploadTooLarge past MAX_UPLOAD_BYTES.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit")
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        content_hash = digest.hexdigest()
+        os.replace(part_path, spool_path(content_hash))
+        return content_hash, size
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+def create_chapter(db: Session, title: str, owner_id: int, content_hash: str, filename: str) -> models.Chapter:
+    """Create a chapter for an upload, reusing extracted text if this file was seen before."""
+    existing = db.query(models.Chapter).filter(models.Chapter.content_hash == content_hash, models.Chapter.status == "ready").first()
+    chapter = models.Chapter(
+        title=title,
+        owner_id=owner_id,
+        content_hash=content_hash,
+        source_filename=filename,
+    )
+    if existing:
+        chapter.content_text = existing.content_text
+        chapter.status = "ready"
+    else:
+        chapter.status = "pending"
+        chapter.heartbeat_at = datetime.utcnow()
+    db.add(chapter)
+    db.commit()
+    db.refresh(chapter)
+    if chapter.status == "ready":
+        _remove_spool(db, content_hash)
+    return chapter
+
+_IN_PROGRESS = ("pending", "processing")
+_LOST_UPLOAD = "Upload was lost before it could be processed. Please upload it again."
+
+def submit(chapter_id: int):
+    # Held (and heartbeated) from here until process_chapter returns
+    _tracker.hold(chapter_id)
+    _executor.submit(process_chapter, chapter_id)
+
+def resume_pending_chapters():
+    """Submit pending chapters and start recovering chapters abandoned by dead processes.
+
+    Every worker process calls this at startup. Submitting the same chapter
+    from several workers is safe because process_chapter claims it atomically.
+    """
+    db = database.SessionLocal()
+    try:
+        chapters = db.query(models.Chapter).filter(models.Chapter.status == "pending").all()
+        chapter_ids = []
+        for chapter in chapters:
+            if os.path.exists(spool_path(chapter.content_hash or "")):
+                chapter_ids.append(chapter.id)
+            else:
+                chapter.status = "failed"
+                chapter.error = _LOST_UPLOAD
+        db.commit()
+    finally:
+        db.close()
+
+    for chapter_id in chapter_ids:
+        submit(chapter_id)
+    requeue_abandoned_chapters()
+    heartbeat.start()
+
+def requeue_abandoned_chapters():
+    """Re-queue and submit chapters whose holding process stopped heartbeating.
+
+    Runs at startup and on every heartbeat, in every process. Chapters whose
+    spooled upload is gone are failed instead.
+    """
+    stale = (
+        models.Chapter.status.in_(_IN_PROGRESS),
+        or_(models.Chapter.heartbeat_at.is_(None), models.Chapter.heartbeat_at < heartbeat.stale_cutoff()),
+    )
+    db = database.SessionLocal()
+    chapter_ids = []
+    try:
+        for chapter_id, content_hash in db.query(models.Chapter.id, models.Chapter.content_hash).filter(*stale).all():
+            if os.path.exists(spool_path(content_hash or "")):
+                changes = {"status": "pending", "heartbeat_at": datetime.utcnow()}
+            else:
+                changes = {"status": "failed", "error": _LOST_UPLOAD}
+            # Conditional, so a chapter another worker recovered first is left to it
+            recovered = db.query(models.Chapter).filter(models.Chapter.id == chapter_id, *stale).update(changes, synchronize_session=False)
+            if recovered and changes["status"] == "pending":
+                chapter_ids.append(chapter_id)
+        db.commit()
+    finally:
+        db.close()
+
+    if chapter_ids:
+        logger.info("Re-queued %d abandoned chapter(s)", len(chapter_ids))
+    for chapter_id in chapter_ids:
+        submit(chapter_id)
+
+_tracker = heartbeat.register(models.Chapter, "heartbeat_at", requeue_abandoned_chapters)
+
+def _claim(db: Session, chapter_id: int) -> bool:
+    """Move a chapter from pending to processing; False if another worker got there first."""
+    claimed = db.query(models.Chapter).filter(
+        models.Chapter.id == chapter_id, models.Chapter.status == "pending"
+    ).update({"status": "processing", "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+def process_chapter(chapter_id: int):
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    try:
+        if not _claim(db, chapter_id):
+            # Claimed by another worker, or already filled in by another upload of the same file
+            return
+        chapter = db.query(models.Chapter).filter(models.Chapter.id == chapter_id).first()
+        content_hash = chapter.content_hash
+
+        # Only "ready" text is reused; failed extractions are retried on the next upload
+        existing = db.query(models.Chapter).filter(models.Chapter.content_hash == content_hash, models.Chapter.status == "ready").first()
+        if existing:
+            text = existing.content_text
+        else:
+            with open(spool_path(content_hash), "rb") as f:
+                content = f.read()
+            text = ocr.extract_text(content, chapter.source_filename or "", cache_scope=f"user:{chapter.owner_id}")
+
+        # Every pending or processing upload of the same file gets the same text
+        db.query(models.Chapter).filter(models.Chapter.content_hash == content_hash, models.Chapter.status.in_(_IN_PROGRESS)).update(
+            {"content_text": text, "status": "ready"}, synchronize_session=False
+        )
+        db.commit()
+        metrics.INGEST_SECONDS.observe(time.perf_counter() - started, status="ready")
+        _remove_spool(db, content_hash)
+    except Exception as e:
+        logger.exception("Processing chapter %d failed: %s", chapter_id, e, extra={"chapter_id": chapter_id})
+        metrics.INGEST_SECONDS.observe(time.perf_counter() - started, status="failed")
+        db.rollback()
+        chapter = db.query(models.Chapter).filter(models.Chapter.id == chapter_id).first()
+        # Not if another upload of the same file already made it ready
+        if chapter and chapter.status == "processing":
+            chapter.status = "failed"
+            chapter.error = f"Error processing file: {str(e)}"
+            db.commit()
+            if chapter.content_hash:
+                # Kept while other uploads of the same file are still pending; they retry from it
+                _remove_spool(db, chapter.content_hash)
+    finally:
+        _tracker.release(chapter_id)
+        db.close()
+
+def _remove_spool(db: Session, content_hash: str):
+    pending = db.query(models.Chapter.id).filter(models.Chapter.content_hash == content_hash, models.Chapter.status.in_(_IN_PROGRESS)).first()
+    path = spool_path(content_hash)
+    if not pending and os.path.exists(path):
+        os.remove(path)
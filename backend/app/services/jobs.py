@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import logging
+import os
+import time
+
+from sqlalchemy.orm import Session
+from .. import models, database, metrics
+from . import export_cache, heartbeat, llm, question_store
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool of generation workers. Jobs beyond this wait in the queue
+# (and in the database), so a burst of requests never blocks the API.
+MAX_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="generation")
+
+def create_job(db: Session, owner_id: int, chapter_id: int, params: dict) -> models.GenerationJob:
+    job = models.GenerationJob(
+        owner_id=owner_id,
+        chapter_id=chapter_id,
+        status="queued",
+        params=json.dumps(params),
+        progress=0,
+        total=params["num_mcqs"] + params["num_short"] + params["num_flashcards"],
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def submit(job_id: int):
+    # Held (and heartbeated) from here until run_job returns, queued or running
+    _tracker.hold(job_id)
+    _executor.submit(run_job, job_id)
+
+def resume_pending_jobs():
+    """Submit queued jobs and start recovering jobs abandoned by dead processes.
+
+    Every worker process calls this at startup. Submitting the same queued
+    job from several workers is safe because run_job claims it atomically.
+    """
+    db = database.SessionLocal()
+    try:
+        job_ids = [job_id for job_id, in db.query(models.GenerationJob.id).filter(models.GenerationJob.status == "queued").order_by(models.GenerationJob.id)]
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        submit(job_id)
+    if job_ids:
+        logger.info("Submitted %d pending generation job(s)", len(job_ids))
+    requeue_abandoned_jobs()
+    heartbeat.start()
+
+def requeue_abandoned_jobs():
+    """Re-queue and submit jobs whose owning process stopped heartbeating.
+
+    A process heartbeats every job it has queued or is running, so a stale
+    queued or running row was left behind by a process that died. Runs at
+    startup and on every heartbeat, in every process.
+    """
+    db = database.SessionLocal()
+    try:
+        stale = (
+            models.GenerationJob.status.in_(("queued", "running")),
+            models.GenerationJob.updated_at < heartbeat.stale_cutoff(),
+        )
+        job_ids = [job_id for job_id, in db.query(models.GenerationJob.id).filter(*stale).order_by(models.GenerationJob.id)]
+        if not job_ids:
+            return
+        db.query(models.GenerationJob).filter(models.GenerationJob.id.in_(job_ids), *stale).update(
+            {"status": "queued", "progress": 0, "updated_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    logger.info("Re-queued %d abandoned generation job(s)", len(job_ids))
+    for job_id in job_ids:
+        submit(job_id)
+
+_tracker = heartbeat.register(models.GenerationJob, "updated_at", requeue_abandoned_jobs)
+
+def _claim(db: Session, job_id: int) -> bool:
+    """Move a job from queued to running; False if another worker got there first."""
+    claimed = db.query(models.GenerationJob).filter(
+        models.GenerationJob.id == job_id, models.GenerationJob.status == "queued"
+    ).update({"status": "running", "updated_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+def run_job(job_id: int):
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    try:
+        if not _claim(db, job_id):
+            return
+        job = db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id).first()
+
+        params = json.loads(job.params)
+        chapter = db.query(models.Chapter).filter(models.Chapter.id == job.chapter_id).first()
+        if not chapter:
+            raise ValueError("Chapter not found")
+
+        def on_progress(done: int, total: int):
+            job.progress = done
+            db.commit()
+
+        generated_data = llm.generate_questions(
+            chapter.content_text,
+            params["num_mcqs"],
+            params["num_short"],
+            params["num_flashcards"],
+            params["difficulty"],
+            on_progress=on_progress,
+            use_cache=not params.get("fresh", False),
+        )
+
+        gen_mcqs = len(generated_data.get("mcqs", []))
+        gen_short = len(generated_data.get("short_questions", []))
+        gen_flash = len(generated_data.get("flashcards", []))
+        logger.info(
+            "Job %d generated MCQs %d/%d, short %d/%d, flashcards %d/%d", job_id,
+            gen_mcqs, params["num_mcqs"], gen_short, params["num_short"], gen_flash, params["num_flashcards"],
+            extra={"job_id": job_id},
+        )
+
+        if gen_mcqs + gen_short + gen_flash == 0:
+            # Every model failed; an empty set is not a result (the stream endpoint errors here too)
+            raise RuntimeError("No questions could be generated. Please try again later.")
+
+        question_set = question_store.create_question_set(db, chapter, job.owner_id, params, generated_data)
+
+        job.status = "completed"
+        job.progress = gen_mcqs + gen_short + gen_flash
+        job.question_set_id = question_set.id
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        metrics.GENERATION_SECONDS.observe(time.perf_counter() - started, status="completed")
+
+        export_cache.prewarm(question_set.id)
+    except Exception as e:
+        logger.exception("Generation job %d failed: %s", job_id, e, extra={"job_id": job_id})
+        metrics.GENERATION_SECONDS.observe(time.perf_counter() - started, status="failed")
+        db.rollback()
+        job = db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = f"LLM Generation failed: {str(e)}"
+            db.commit()
+    finally:
+        _tracker.release(job_id)
+        db.close()
@@ -1,23 +1,50 @@
 import os
-from groq import Groq
+import asyncio
 import json
+import logging
+import time
+from collections import Counter
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+from .. import metrics
+from . import batch_sizing, chunking, dedup, generation_cache, model_router, providers, rate_limit
 
-# Ensure GROQ_API_KEY is set in environment variables
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+logger = logging.getLogger(__name__)
 
-def generate_questions(text: str, num_mcqs: int = 5, num_short: int = 3, num_flashcards: int = 0, difficulty: str = "Medium"):
+# Default fallback order; model_router picks the order per batch from difficulty and model health.
+MODELS = model_router.DEFAULT_MODELS
+
+# Starting questions per batch; batch_sizing adapts it per model from observed responses.
+BATCH_SIZE = batch_sizing.INITIAL_BATCH_SIZE
+
+# Bump whenever build_prompt changes, so cached batches from the old prompt are not reused.
+PROMPT_VERSION = "2"
+
+# Upper bound on batches in flight at once for a single generation request.
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+
+# Shortfall top-up waves after the first wave (e.g. when a model returns fewer questions than asked).
+MAX_TOPUP_ROUNDS = 3
+
+# Longest a batch waits for a model's rate limit before falling through to the next model,
+# and how many times it retries a model that answered 429 within that wait.
+RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "30"))
+RATE_LIMIT_RETRIES = 2
+
+# Top-up prompts list up to this many already-generated questions per section as topics to avoid.
+COVERED_TOPICS_LIMIT = int(os.getenv("COVERED_TOPICS_LIMIT", "40"))
+COVERED_TOPIC_CHARS = 120
+
+def build_prompt(text: str, num_mcqs: int, num_short: int, num_flashcards: int, difficulty: str, avoid: Optional[List[str]] = None) -> str:
     prompt = f"""
     You are an expert exam question generator. Based on the provided text, generate the following questions:
     - EXACTLY {num_mcqs} Multiple Choice Questions (MCQs) with 4 options and the correct answer indicated.
     - EXACTLY {num_short} Short Answer Questions (1-2 sentences).
     - EXACTLY {num_flashcards} Flashcards (Front/Back).
-    
+
     CRITICAL INSTRUCTION: You MUST generate EXACTLY the number of questions requested above. Do not generate more or fewer.
-    
+
     Difficulty Level: {difficulty}
-    
+
     Return the output in pure JSON format with the following structure:
     {{
         "mcqs": [
@@ -40,113 +67,258 @@ def generate_questions(text: str, num_mcqs: int = 5, num_short: int = 3, num_fla
             }}
         ]
     }}
-    
+
     Text content:
-    {text[:15000]}  # Limit text length to avoid token limits if necessary
+    {text}
+    """
+    if avoid:
+        covered = "\n".join(f"    - {topic}" for topic in avoid)
+        prompt += f"""
+    These questions already exist. Do NOT repeat them or ask about the same facts; cover other parts of the text:
+{covered}
     """
-    
-    models = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "llama-3.2-3b-preview"]
-    
-    all_mcqs = []
-    all_short = []
-    all_flashcards = []
-    
-    BATCH_SIZE = 10
-    
-    # Loop until we have enough questions or fail to make progress
-    max_retries = 15 # Safety limit to prevent infinite loops (e.g. if we need 100, 10 batches + buffer)
-    retries = 0
-    
-    while (len(all_mcqs) < num_mcqs or len(all_short) < num_short or len(all_flashcards) < num_flashcards) and retries < max_retries:
-        retries += 1
-        
-        # Calculate how many needed for this batch
-        req_mcqs = min(num_mcqs - len(all_mcqs), BATCH_SIZE)
-        req_short = min(num_short - len(all_short), BATCH_SIZE)
-        req_flash = min(num_flashcards - len(all_flashcards), BATCH_SIZE)
-        
-        # If we don't need anything, break (should be covered by while condition, but safety)
-        if req_mcqs <= 0 and req_short <= 0 and req_flash <= 0:
-            break
-            
-        print(f"DEBUG: Batch {retries} - Requesting: MCQs={req_mcqs}, Short={req_short}, Flash={req_flash}")
-        
-        batch_prompt = f"""
-        You are an expert exam question generator. Based on the provided text, generate the following questions:
-        - EXACTLY {req_mcqs} Multiple Choice Questions (MCQs) with 4 options and the correct answer indicated.
-        - EXACTLY {req_short} Short Answer Questions (1-2 sentences).
-        - EXACTLY {req_flash} Flashcards (Front/Back).
-        
-        CRITICAL INSTRUCTION: You MUST generate EXACTLY the number of questions requested above. Do not generate more or fewer.
-        
-        Difficulty Level: {difficulty}
-        
-        Return the output in pure JSON format with the following structure:
-        {{
-            "mcqs": [
-                {{
-                    "question": "Question text",
-                    "options": ["Option A", "Option B", "Option C", "Option D"],
-                    "correct_answer": "Option A"
-                }}
-            ],
-            "short_questions": [
-                {{
-                    "question": "Question text",
-                    "answer": "Model answer"
-                }}
-            ],
-            "flashcards": [
-                {{
-                    "front": "Term or Concept",
-                    "back": "Definition or Explanation"
-                }}
+    return prompt
+
+def plan_batches(num_mcqs: int, num_short: int, num_flashcards: int, batch_size: int = BATCH_SIZE) -> List[Tuple[int, int, int]]:
+    """Split the requested counts into (mcqs, short, flashcards) batches of at most batch_size each."""
+    batches = []
+    while num_mcqs > 0 or num_short > 0 or num_flashcards > 0:
+        batch = (min(max(num_mcqs, 0), batch_size), min(max(num_short, 0), batch_size), min(max(num_flashcards, 0), batch_size))
+        batches.append(batch)
+        num_mcqs -= batch[0]
+        num_short -= batch[1]
+        num_flashcards -= batch[2]
+    return batches
+
+async def _generate_batch(provider, semaphore: asyncio.Semaphore, text: str, batch: Tuple[int, int, int], difficulty: str, label: str, cache_keys: Optional[dict] = None, use_cache: bool = True, avoid: Optional[List[str]] = None) -> Optional[dict]:
+    cached = {}
+    if cache_keys and use_cache:
+        hit = await asyncio.to_thread(generation_cache.get_batch, [(model, cache_keys[model]) for model in model_router.router.preferred(difficulty)])
+        if hit:
+            cached_model, cached = hit
+            remaining = tuple(count - len(cached.get(key, [])) for key, count in zip(QUESTION_KEYS, batch))
+            if not any(remaining):
+                logger.debug("Batch %s served from cache (%s)", label, cached_model)
+                metrics.LLM_BATCHES.inc(outcome="cached")
+                return cached
+            # Only the questions past the cached ones are generated
+            logger.debug("Batch %s has %d of %d question(s) cached (%s)", label, sum(batch) - sum(remaining), sum(batch), cached_model)
+            batch = remaining
+    req_mcqs, req_short, req_flash = batch
+
+    batch_prompt = build_prompt(text, req_mcqs, req_short, req_flash, difficulty, avoid)
+
+    async with semaphore:
+        logger.debug("Batch %s requesting MCQs=%d, Short=%d, Flash=%d", label, req_mcqs, req_short, req_flash)
+        requested = req_mcqs + req_short + req_flash
+        prompt_tokens = chunking.estimate_tokens(batch_prompt)
+        for model in model_router.router.route(difficulty):
+            sizer = batch_sizing.sizer.model(model)
+            estimated_tokens = prompt_tokens + sizer.expected_completion_tokens(requested)
+            claimed = False
+            for attempt in range(RATE_LIMIT_RETRIES + 1):
+                if not await rate_limit.limiter.acquire(model, estimated_tokens, max_wait=RATE_LIMIT_MAX_WAIT):
+                    logger.warning("Model %s is rate limited beyond %ss for batch %s", model, RATE_LIMIT_MAX_WAIT, label)
+                    break
+                # Claimed only once the call is about to go out, so a half-open model's single probe
+                # is not spent on a batch that ends up not calling it
+                if not claimed:
+                    if not model_router.router.allow(model, difficulty):
+                        rate_limit.limiter.reconcile(model, estimated_tokens, 0)
+                        logger.debug("Model %s breaker is open for batch %s", model, label)
+                        break
+                    claimed = True
+                try:
+                    logger.debug("Trying model %s for batch %s", model, label)
+                    started = time.monotonic()
+                    completion = await provider.complete(model, batch_prompt, batch_sizing.MAX_COMPLETION_TOKENS)
+                except Exception as e:
+                    outcome = "rate_limited" if rate_limit.is_rate_limited(e) else "error"
+                    metrics.LLM_CALL_SECONDS.observe(time.monotonic() - started, model=model, outcome=outcome)
+                    if outcome == "rate_limited":
+                        # Rejected requests are not billed against the token quota
+                        rate_limit.limiter.reconcile(model, estimated_tokens, 0)
+                        rate_limit.limiter.penalize(model, rate_limit.retry_after(e))
+                        logger.warning("Model %s rate limited for batch %s (attempt %d)", model, label, attempt + 1)
+                        continue
+                    model_router.router.record_failure(model, e)
+                    logger.warning("Model %s failed for batch %s: %s", model, label, e)
+                    break
+
+                elapsed = time.monotonic() - started
+                if completion.total_tokens is not None:
+                    rate_limit.limiter.reconcile(model, estimated_tokens, completion.total_tokens)
+                if completion.prompt_tokens is not None:
+                    metrics.LLM_TOKENS.inc(completion.prompt_tokens, model=model, kind="prompt")
+                if completion.completion_tokens is not None:
+                    metrics.LLM_TOKENS.inc(completion.completion_tokens, model=model, kind="completion")
+                try:
+                    result = json.loads(completion.text)
+                except (TypeError, ValueError) as e:
+                    sizer.record(requested, completion.completion_tokens, elapsed, truncated=True)
+                    model_router.router.record_invalid(model, elapsed, str(e))
+                    metrics.LLM_CALL_SECONDS.observe(elapsed, model=model, outcome="invalid")
+                    logger.warning("Model %s returned unparseable output for batch %s: %s", model, label, e)
+                    break
+                sizer.record(requested, completion.completion_tokens, elapsed, truncated=completion.finish_reason == "length")
+                model_router.router.record_success(model, elapsed)
+                metrics.LLM_CALL_SECONDS.observe(elapsed, model=model, outcome="ok")
+                metrics.LLM_BATCHES.inc(outcome="generated")
+                if cache_keys:
+                    uncached_keys = {key: keys[len(cached.get(key, [])):] for key, keys in cache_keys[model].items()}
+                    await asyncio.to_thread(generation_cache.put_batch, uncached_keys, model, result)
+                if cached:
+                    result = {**result, **{key: cached.get(key, []) + (result.get(key) or []) for key in QUESTION_KEYS}}
+                return result
+
+    logger.error("All models failed for batch %s", label)
+    metrics.LLM_BATCHES.inc(outcome="failed")
+    return cached or None
+
+QUESTION_KEYS = ("mcqs", "short_questions", "flashcards")
+
+def batching_model_size(difficulty: str) -> int:
+    """Adaptive batch size of the model expected to serve most batches."""
+    return batch_sizing.sizer.size(model_router.router.primary(difficulty))
+
+def question_text(key: str, item) -> str:
+    """The part of a generated item that identifies what it asks."""
+    if isinstance(item, dict):
+        text = item.get("front") if key == "flashcards" else item.get("question")
+        if text:
+            return str(text)
+    return json.dumps(item, sort_keys=True)
+
+async def iter_question_batches(text: str, num_mcqs: int = 5, num_short: int = 3, num_flashcards: int = 0, difficulty: str = "Medium", max_concurrency: int = MAX_CONCURRENCY, use_cache: bool = True) -> AsyncIterator[dict]:
+    """Generate questions over the whole text, yielding each batch as soon as it returns.
+
+    The text is split into token-bounded sections and the requested counts
+    are spread across them in proportion to their size. Every planned batch
+    runs concurrently; only once a wave has returned are top-up batches
+    planned for whatever a section under-delivered. Near-duplicates of
+    questions already accepted anywhere in the text are dropped as batches
+    arrive, so they count toward the shortfall, and top-up prompts list the
+    section's existing questions as topics to avoid. Batches are looked up in
+    the generation cache first unless use_cache is False; fresh results are
+    always written back.
+
+    Each yielded dict holds the section index, the batch's mcqs,
+    short_questions and flashcards (clipped to what the section still
+    needed), and the running progress/total counts.
+    """
+    sections = chunking.split_sections(text)
+    weights = [len(section) for section in sections]
+    targets = list(zip(
+        chunking.allocate(num_mcqs, weights),
+        chunking.allocate(num_short, weights),
+        chunking.allocate(num_flashcards, weights),
+    ))
+    received = [[0, 0, 0] for _ in sections]
+    total = num_mcqs + num_short + num_flashcards
+
+    def shortfall(i: int) -> Tuple[int, int, int]:
+        return tuple(target - got for target, got in zip(targets[i], received[i]))
+
+    def done() -> int:
+        return sum(sum(counts) for counts in received)
+
+    kinds = max(1, sum(1 for count in (num_mcqs, num_short, num_flashcards) if count > 0))
+
+    def plan() -> List[Tuple[int, Tuple[int, int, int]]]:
+        # The adaptive size is questions per batch, shared between the requested question types
+        batch_size = max(1, -(-batching_model_size(difficulty) // kinds))
+        return [(i, batch) for i in range(len(sections)) for batch in plan_batches(*shortfall(i), batch_size=batch_size)]
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    digests = [generation_cache.text_digest(section) for section in sections]
+    slots = Counter()
+    indexes = {key: dedup.QuestionIndex() for key in QUESTION_KEYS}
+    covered = [[] for _ in sections]
+    dropped = 0
+
+    def keys_for(i: int, batch: Tuple[int, int, int], avoid: List[str]) -> dict:
+        """{model: {kind: [cache key per question slot]}} for the next questions of each kind in section i."""
+        # Top-up prompts depend on what was already generated, so that is part of the key
+        digest = generation_cache.text_digest("\n".join([digests[i]] + avoid)) if avoid else digests[i]
+        kind_slots = {}
+        for key, count in zip(QUESTION_KEYS, batch):
+            first = slots[(digest, key)]
+            slots[(digest, key)] += count
+            kind_slots[key] = range(first, first + count)
+        return {
+            model: {key: [generation_cache.make_key(digest, key, difficulty, model, PROMPT_VERSION, slot) for slot in kind_slots[key]] for key in QUESTION_KEYS}
+            for model in model_router.router.models()
+        }
+
+    async def run(i: int, batch: Tuple[int, int, int], label: str):
+        avoid = [topic[:COVERED_TOPIC_CHARS] for topic in covered[i][-COVERED_TOPICS_LIMIT:]]
+        return i, await _generate_batch(provider, semaphore, sections[i], batch, difficulty, label, keys_for(i, batch, avoid), use_cache, avoid)
+
+    async with providers.create() as provider:
+        batches = plan()
+        logger.debug("Planned %d batch(es) over %d section(s)", len(batches), len(sections))
+        wave = 0
+        while batches:
+            tasks = [
+                asyncio.create_task(run(i, batch, f"{wave + 1}.{n + 1}"))
+                for n, (i, batch) in enumerate(batches)
             ]
-        }}
-        
-        Text content:
-        {text[:15000]}  # Limit text length to avoid token limits if necessary
-        """
-        
-        batch_success = False
-        for model in models:
+            before = done()
             try:
-                print(f"DEBUG: Trying model {model} for batch {retries}...")
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": batch_prompt,
-                        }
-                    ],
-                    model=model,
-                    response_format={"type": "json_object"},
-                )
-                result = json.loads(chat_completion.choices[0].message.content)
-                
-                # Append results
-                if "mcqs" in result:
-                    all_mcqs.extend(result["mcqs"])
-                if "short_questions" in result:
-                    all_short.extend(result["short_questions"])
-                if "flashcards" in result:
-                    all_flashcards.extend(result["flashcards"])
-                
-                batch_success = True
-                break # Move to next batch if successful
-            except Exception as e:
-                print(f"WARNING: Model {model} failed for batch {retries}: {e}")
-                continue
-        
-        if not batch_success:
-            print("ERROR: All models failed for this batch. Stopping generation.")
-            break
-            
-    # Construct final result
+                for next_result in asyncio.as_completed(tasks):
+                    i, result = await next_result
+                    if not result:
+                        continue
+                    batch_result = {"section": i}
+                    for k, key in enumerate(QUESTION_KEYS):
+                        accepted = []
+                        for item in result.get(key, []):
+                            if len(accepted) >= shortfall(i)[k]:
+                                break
+                            question = question_text(key, item)
+                            if not indexes[key].add(question):
+                                dropped += 1
+                                continue
+                            accepted.append(item)
+                            covered[i].append(question)
+                        received[i][k] += len(accepted)
+                        batch_result[key] = accepted
+                    batch_result["progress"] = done()
+                    batch_result["total"] = total
+                    yield batch_result
+            finally:
+                # The consumer may stop early (e.g. a disconnected stream)
+                for task in tasks:
+                    task.cancel()
+
+            wave += 1
+            if done() == before or wave > MAX_TOPUP_ROUNDS:
+                # No progress (every model failing) or out of top-up rounds
+                break
+            batches = plan()
+
+    if dropped:
+        logger.debug("Dropped %d near-duplicate question(s)", dropped)
+    await asyncio.to_thread(generation_cache.evict)
+
+async def agenerate_questions(text: str, num_mcqs: int = 5, num_short: int = 3, num_flashcards: int = 0, difficulty: str = "Medium", on_progress: Optional[Callable[[int, int], None]] = None, max_concurrency: int = MAX_CONCURRENCY, use_cache: bool = True):
+    """Collect every batch from iter_question_batches into one result."""
+    sections = {}
+    async for batch in iter_question_batches(text, num_mcqs, num_short, num_flashcards, difficulty, max_concurrency=max_concurrency, use_cache=use_cache):
+        section = sections.setdefault(batch["section"], {key: [] for key in QUESTION_KEYS})
+        for key in QUESTION_KEYS:
+            section[key].extend(batch[key])
+        if on_progress:
+            on_progress(batch["progress"], batch["total"])
+
+    # Reduce: concatenate per-section results in document order
     final_result = {
-        "mcqs": all_mcqs[:num_mcqs],
-        "short_questions": all_short[:num_short],
-        "flashcards": all_flashcards[:num_flashcards]
+        key: [q for i in sorted(sections) for q in sections[i][key]]
+        for key in QUESTION_KEYS
     }
-    
+
     return final_result
+
+def generate_questions(text: str, num_mcqs: int = 5, num_short: int = 3, num_flashcards: int = 0, difficulty: str = "Medium", on_progress: Optional[Callable[[int, int], None]] = None, use_cache: bool = True):
+    """Blocking entry point for worker threads; runs the async engine on its own event loop."""
+    return asyncio.run(agenerate_questions(text, num_mcqs, num_short, num_flashcards, difficulty, on_progress=on_progress, use_cache=use_cache))
@@ -0,0 +1,208 @@
+"""Route LLM batches to the best healthy model.
+
+Each model keeps a rolling window of recent calls (success, latency, valid
+JSON) and a circuit breaker. After BREAKER_FAILURES consecutive failures,
+or a failure rate over BREAKER_FAILURE_RATE across the window, the breaker
+opens and the model is skipped. Once the cooldown passes, one probe batch
+is let through at a time; a success closes the breaker and a failure
+reopens it with a doubled cooldown. Decommissioned models stay open for
+BREAKER_MAX_COOLDOWN.
+
+route() orders models by the difficulty's preference list, moving models
+that miss their latency or quality targets behind those that meet them.
+Rate limiting (429) is not counted as a failure; rate_limit handles it.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "50"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_MIN_SAMPLES = 10
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("LLM_BREAKER_MAX_COOLDOWN_SECONDS", "3600"))
+
+# Models meeting these keep their preferred position
+P95_BUDGET_SECONDS = float(os.getenv("LLM_P95_BUDGET_SECONDS", "30"))
+MIN_SUCCESS_RATE = 0.8
+MIN_JSON_VALIDITY = 0.9
+
+DEFAULT_MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "llama-3.2-3b-preview"]
+
+# Difficulty -> model preference. Easy questions don't need the largest model.
+MODEL_PREFERENCES = json.loads(os.getenv("LLM_MODEL_PREFERENCES", "null")) or {
+    "Easy": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile", "llama-3.2-3b-preview"],
+    "Medium": DEFAULT_MODELS,
+    "Hard": DEFAULT_MODELS,
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def is_decommissioned(error: Exception) -> bool:
+    message = str(error).lower()
+    return getattr(error, "status_code", None) == 404 or "decommissioned" in message or "model_not_found" in message
+
+class ModelHealth:
+    def __init__(self):
+        self.calls = deque(maxlen=WINDOW) # (succeeded, seconds, valid_json)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.open_until = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def is_available(self, now: float) -> bool:
+        """Whether allow() would let a call through, without claiming a half-open probe."""
+        with self._lock:
+            return self.state == CLOSED or now >= self.open_until
+
+    def allow(self, now: float) -> bool:
+        """Claim a call. Only call this right before using the model: it spends the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if now < self.open_until:
+                return False
+            # Half-open: one probe per cooldown period until one succeeds
+            self.state = HALF_OPEN
+            self.open_until = now + self.cooldown
+            return True
+
+    def record(self, succeeded: bool, seconds: Optional[float], valid_json: bool, error: Optional[str] = None, decommissioned: bool = False):
+        with self._lock:
+            ok = succeeded and valid_json
+            self.calls.append((succeeded, seconds, valid_json))
+            now = time.monotonic()
+            if ok:
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    self.state = CLOSED
+                    self.cooldown = BREAKER_COOLDOWN
+                return
+
+            self.consecutive_failures += 1
+            self.last_error = error
+            failures = sum(1 for s, _, v in self.calls if not (s and v))
+            tripped = (
+                decommissioned
+                or self.state == HALF_OPEN
+                or self.consecutive_failures >= BREAKER_FAILURES
+                or (len(self.calls) >= BREAKER_MIN_SAMPLES and failures / len(self.calls) > BREAKER_FAILURE_RATE)
+            )
+            if tripped:
+                if self.state == HALF_OPEN:
+                    self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                if decommissioned:
+                    self.cooldown = BREAKER_MAX_COOLDOWN
+                self.state = OPEN
+                self.open_until = now + self.cooldown
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+            state, open_until, consecutive_failures, last_error = self.state, self.open_until, self.consecutive_failures, self.last_error
+        latencies = [seconds for succeeded, seconds, _ in calls if succeeded and seconds is not None]
+        completed = [valid for succeeded, _, valid in calls if succeeded]
+        return {
+            "state": state,
+            "samples": len(calls),
+            "success_rate": round(sum(1 for succeeded, _, _ in calls if succeeded) / len(calls), 3) if calls else None,
+            "json_validity": round(sum(completed) / len(completed), 3) if completed else None,
+            "p50_seconds": _percentile(latencies, 50),
+            "p95_seconds": _percentile(latencies, 95),
+            "consecutive_failures": consecutive_failures,
+            "open_for_seconds": round(max(0.0, open_until - time.monotonic()), 1) if state != CLOSED else 0.0,
+            "last_error": last_error,
+        }
+
+    def meets_targets(self) -> bool:
+        stats = self.stats()
+        if stats["samples"] < BREAKER_MIN_SAMPLES:
+            return True # Not enough data to demote it
+        return (
+            stats["success_rate"] >= MIN_SUCCESS_RATE
+            and (stats["json_validity"] is None or stats["json_validity"] >= MIN_JSON_VALIDITY)
+            and (stats["p95_seconds"] is None or stats["p95_seconds"] <= P95_BUDGET_SECONDS)
+        )
+
+class ModelRouter:
+    def __init__(self, preferences: Dict[str, List[str]], default_models: List[str]):
+        self.preferences = preferences
+        self.default_models = default_models
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def health(self, model: str) -> ModelHealth:
+        with self._lock:
+            health = self._health.get(model)
+            if health is None:
+                health = self._health[model] = ModelHealth()
+            return health
+
+    def preferred(self, difficulty: str) -> List[str]:
+        return self.preferences.get(difficulty) or self.default_models
+
+    def models(self) -> List[str]:
+        """Every model any route can use, in default order."""
+        seen = list(self.default_models)
+        for models in self.preferences.values():
+            seen.extend(model for model in models if model not in seen)
+        return seen
+
+    def primary(self, difficulty: str) -> str:
+        """The model expected to serve most batches, without claiming a probe."""
+        now = time.monotonic()
+        for model in self.preferred(difficulty):
+            if self.health(model).is_available(now):
+                return model
+        return self.preferred(difficulty)[0]
+
+    def route(self, difficulty: str) -> List[str]:
+        """Models to try for one batch, best first. Open breakers are skipped.
+
+        If every breaker is open, the one that reopens soonest is returned so
+        the batch still gets a chance. Nothing is claimed here; call allow()
+        right before calling each model.
+        """
+        now = time.monotonic()
+        preferred = self.preferred(difficulty)
+        available = [model for model in preferred if self.health(model).is_available(now)]
+        if not available:
+            return [min(preferred, key=lambda model: self.health(model).open_until)]
+        # Stable sort: models meeting their targets keep preference order ahead of the rest
+        return sorted(available, key=lambda model: not self.health(model).meets_targets())
+
+    def allow(self, model: str, difficulty: str) -> bool:
+        """Claim model for a call about to be made; a half-open breaker lets one probe through.
+
+        The route() fallback for when every breaker is open is let through too.
+        """
+        now = time.monotonic()
+        if self.health(model).allow(now):
+            return True
+        return not any(self.health(other).is_available(now) for other in self.preferred(difficulty))
+
+    def record_success(self, model: str, seconds: float):
+        self.health(model).record(True, seconds, True)
+
+    def record_invalid(self, model: str, seconds: float, error: str):
+        self.health(model).record(True, seconds, False, error)
+
+    def record_failure(self, model: str, error: Exception):
+        self.health(model).record(False, None, True, str(error)[:300], decommissioned=is_decommissioned(error))
+
+    def snapshot(self) -> dict:
+        return {model: self.health(model).stats() for model in self.models()}
+
+router = ModelRouter(MODEL_PREFERENCES, DEFAULT_MODELS)
@@ -1,58 +1,257 @@
-import pytesseract
-from pdf2image import convert_from_bytes
-from PIL import Image
 import io
-from pypdf import PdfReader
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import os
 import shutil
+import tempfile
+import time
+from .. import metrics
+from . import page_cache
+from .process_pool import SpawnPool
+
+logger = logging.getLogger(__name__)
+
+# pytesseract, pdf2image, PIL and pypdf are imported where they are used, so
+# starting the API does not pay for them before the first upload.
 
 # Check if tesseract is available
 TESSERACT_AVAILABLE = shutil.which("tesseract") is not None
 
+# Rasterization resolution for OCR. 300 is sharper for small print, 150 is faster and lighter.
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() == "true"
+
+# One OCR process per core. Each process renders and OCRs a single page at a
+# time, and at most OCR_WINDOW pages are in flight, so peak memory is bounded
+# by the window and not by the page count of the document.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_WINDOW = int(os.getenv("OCR_WINDOW", str(OCR_WORKERS * 2)))
+
+# Pages with no text layer, or with images and fewer non-whitespace
+# characters than this, are treated as scanned and OCRed.
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "50"))
+
+_pool = SpawnPool(OCR_WORKERS)
+
+def _ocr_page(pdf_path: str, page_number: int, dpi: int, grayscale: bool) -> Tuple[str, float]:
+    """Render one page and OCR it. Runs in a pool process; returns the text and seconds taken."""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    started = time.perf_counter()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=grayscale)
+    try:
+        return "\n".join(pytesseract.image_to_string(image) for image in images), time.perf_counter() - started
+    finally:
+        for image in images:
+            image.close()
+
+def ocr_pdf_pages(pdf_bytes: bytes, page_numbers: Optional[Iterable[int]] = None, dpi: int = OCR_DPI) -> Dict[int, str]:
+    """OCR the given 1-based pages (all pages by default) in the process pool.
+
+    Returns {page_number: text}. The PDF is written to a temporary file once so
+    each worker can render just its own page.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+        pdf_path = tmp.name
+    try:
+        if page_numbers is None:
+            from pdf2image import pdfinfo_from_path
+            page_numbers = range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1)
+        pending_pages = iter(page_numbers)
+        pool = _pool.get()
+        in_flight = {}
+        results = {}
+
+        def fill_window():
+            while len(in_flight) < OCR_WINDOW:
+                page_number = next(pending_pages, None)
+                if page_number is None:
+                    return
+                in_flight[pool.submit(_ocr_page, pdf_path, page_number, dpi, OCR_GRAYSCALE)] = page_number
+
+        fill_window()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                text, seconds = future.result()
+                metrics.OCR_PAGE_SECONDS.observe(seconds, method="ocr")
+                results[in_flight.pop(future)] = text
+            fill_window()
+        return results
+    finally:
+        os.unlink(pdf_path)
+
+class ExtractionError(Exception):
+    """No text could be extracted; the message is shown to the uploader."""
+
 def extract_text_from_image(image_bytes: bytes) -> str:
     if not TESSERACT_AVAILABLE:
-        return "[Error: Tesseract OCR is not installed on the server. Cannot extract text from images.]"
-    
+        raise ExtractionError("Tesseract OCR is not installed on the server. Cannot extract text from images.")
+
     try:
+        import pytesseract
+        from PIL import Image
+
         image = Image.open(io.BytesIO(image_bytes))
         return pytesseract.image_to_string(image)
     except Exception as e:
-        return f"[Error extracting text from image: {str(e)}]"
+        raise ExtractionError(f"Could not extract text from image: {e}") from e
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    text = ""
-    
-    # Method 1: Try pypdf (no external dependencies, works for digital PDFs)
+def _resource(resources, key: str) -> dict:
     try:
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        for page in reader.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-    except Exception as e:
-        print(f"pypdf extraction failed: {e}")
+        return resources[key].get_object() if key in resources else {}
+    except (KeyError, TypeError, AttributeError):
+        return {}
 
-    # If pypdf found text, return it
-    if text.strip():
-        return text
+def _hash_resources(digest, resources, images: List, seen: set):
+    """Hash the fonts and XObjects a resource dictionary makes drawable.
+
+    Form XObjects and tiling patterns are content streams of their own, so
+    their streams and resources are hashed recursively; a page whose content
+    is only `/Fm0 Do` is identified by what the form draws. Images found at
+    any depth are appended to images.
+    """
+    if resources is None:
+        return
+    resources = resources.get_object()
+    fonts = _resource(resources, "/Font")
+    for name in sorted(fonts):
+        # Identical content streams decode to different text under different fonts
+        font = fonts[name].get_object()
+        digest.update(f"font {name}:{font.get('/BaseFont')}".encode("utf-8"))
+        if "/ToUnicode" in font:
+            digest.update(font["/ToUnicode"].get_object().get_data())
+    for kind in ("/XObject", "/Pattern"):
+        entries = _resource(resources, kind)
+        for name in sorted(entries):
+            reference = entries[name]
+            entry = reference.get_object()
+            subtype = entry.get("/Subtype") or entry.get("/PatternType")
+            digest.update(f"{kind} {name}:{subtype}".encode("utf-8"))
+            if subtype == "/Image":
+                images.append(entry)
+                digest.update(entry.get_data())
+            elif subtype == "/Form" or (kind == "/Pattern" and subtype == 1):
+                # Shared forms are hashed once; this also stops reference cycles
+                key = (reference.idnum, reference.generation) if hasattr(reference, "idnum") else id(entry)
+                if key in seen:
+                    continue
+                seen.add(key)
+                digest.update(entry.get_data())
+                _hash_resources(digest, entry.get("/Resources"), images, seen)
+
+def _page_fingerprint(page) -> Tuple[str, List]:
+    """Hash of what a page draws, and every image it draws at any depth.
+
+    Covers the content stream, font mappings, images, and the streams and
+    resources of nested Form XObjects and tiling patterns.
+    """
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    images = []
+    _hash_resources(digest, page.get("/Resources"), images, set())
+    return digest.hexdigest(), images
+
+def _usable_chars(text: Optional[str]) -> int:
+    return len("".join((text or "").split()))
+
+def extract_text_from_pdf(pdf_bytes: bytes, dpi: int = OCR_DPI, cache_scope: Optional[str] = None) -> str:
+    """Extract text page by page, OCRing only the pages that need it.
+
+    Pages with a usable text layer are read with pypdf. Pages with no text
+    layer, or image pages below OCR_MIN_PAGE_CHARS, are rasterized and OCRed.
+    Results are stored per page fingerprint within cache_scope (the
+    uploader), so re-uploading an edited document only processes the pages
+    that changed, and one user's pages are never served to another. Without
+    a cache_scope the page cache is not used.
+    """
+    from pypdf import PdfReader
 
-    # Method 2: Fallback to OCR (works for scanned PDFs, requires Tesseract & Poppler)
-    if not TESSERACT_AVAILABLE:
-        return "[Error: This appears to be a scanned PDF. Tesseract OCR is not installed to handle it.]"
-        
     try:
-        images = convert_from_bytes(pdf_bytes)
-        ocr_text = ""
-        for image in images:
-            ocr_text += pytesseract.image_to_string(image) + "\n"
-        return ocr_text
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        pages = list(reader.pages)
     except Exception as e:
-        return f"[Error extracting text from PDF (OCR): {str(e)}. Ensure Poppler is installed.]"
+        logger.warning("pypdf extraction failed: %s", e)
+        pages = None
+
+    if pages is None:
+        # Unreadable by pypdf: OCR every page (works for scanned PDFs, requires Tesseract & Poppler)
+        if not TESSERACT_AVAILABLE:
+            raise ExtractionError("This appears to be a scanned PDF. Tesseract OCR is not installed to handle it.")
+        try:
+            texts = ocr_pdf_pages(pdf_bytes, dpi=dpi)
+        except Exception as e:
+            raise ExtractionError(f"Could not OCR the PDF: {e}. Ensure Poppler is installed.") from e
+        return "".join(texts[page_number] + "\n" for page_number in sorted(texts))
+
+    fingerprints = {}
+    page_images = {}
+    for page_number, page in enumerate(pages, 1):
+        try:
+            fingerprint, page_images[page_number] = _page_fingerprint(page)
+            fingerprints[page_number] = hashlib.sha256(f"{cache_scope}|{fingerprint}".encode("utf-8")).hexdigest()
+        except Exception as e:
+            logger.warning("Could not fingerprint page %d: %s", page_number, e)
+            page_images.setdefault(page_number, [])
+
+    use_page_cache = cache_scope is not None
+    cached = page_cache.get_many(fingerprints.values()) if use_page_cache else {}
+    texts = {}
+    new_pages = {}
+    needs_ocr = []
+    for page_number, page in enumerate(pages, 1):
+        fingerprint = fingerprints.get(page_number)
+        if fingerprint in cached:
+            texts[page_number] = cached[fingerprint]
+            continue
+        started = time.perf_counter()
+        try:
+            extracted = page.extract_text() or ""
+        except Exception as e:
+            logger.warning("pypdf extraction failed for page %d: %s", page_number, e)
+            extracted = ""
+        metrics.OCR_PAGE_SECONDS.observe(time.perf_counter() - started, method="text")
+        texts[page_number] = extracted
+        chars = _usable_chars(extracted)
+        if chars == 0 or (chars < OCR_MIN_PAGE_CHARS and page_images[page_number]):
+            needs_ocr.append(page_number)
+        elif fingerprint:
+            new_pages[fingerprint] = ("TEXT", extracted)
+
+    ocr_error = None
+    if needs_ocr:
+        if not TESSERACT_AVAILABLE:
+            ocr_error = "This appears to be a scanned PDF. Tesseract OCR is not installed to handle it."
+        else:
+            try:
+                for page_number, ocr_text in ocr_pdf_pages(pdf_bytes, needs_ocr, dpi=dpi).items():
+                    # Keep whichever of the text layer and OCR found more
+                    if _usable_chars(ocr_text) >= _usable_chars(texts[page_number]):
+                        texts[page_number] = ocr_text
+                    if fingerprints.get(page_number):
+                        new_pages[fingerprints[page_number]] = ("OCR", texts[page_number])
+            except Exception as e:
+                ocr_error = f"Could not OCR the PDF: {e}. Ensure Poppler is installed."
+
+    if use_page_cache:
+        page_cache.put_many(new_pages)
+
+    text = "".join(texts[page_number] + "\n" for page_number in sorted(texts) if texts[page_number])
+    if not text.strip() and ocr_error:
+        raise ExtractionError(ocr_error)
+    return text
 
-def extract_text(file_bytes: bytes, filename: str) -> str:
+def extract_text(file_bytes: bytes, filename: str, cache_scope: Optional[str] = None) -> str:
     if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
         return extract_text_from_image(file_bytes)
     elif filename.lower().endswith('.pdf'):
-        return extract_text_from_pdf(file_bytes)
+        return extract_text_from_pdf(file_bytes, cache_scope=cache_scope)
     else:
         # Assume text file
         try:
@@ -0,0 +1,37 @@
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from .. import models, database
+
+def get_many(page_hashes: Iterable[str]) -> Dict[str, str]:
+    """Return {page_hash: text} for pages already extracted."""
+    page_hashes = list(page_hashes)
+    if not page_hashes:
+        return {}
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.PageText.page_hash, models.PageText.text).filter(models.PageText.page_hash.in_(page_hashes)).all()
+        return {page_hash: text for page_hash, text in rows}
+    finally:
+        db.close()
+
+def put_many(pages: Dict[str, Tuple[str, str]]):
+    """Store {page_hash: (method, text)}; pages stored concurrently by another upload are skipped."""
+    if not pages:
+        return
+    db = database.SessionLocal()
+    try:
+        existing = {row[0] for row in db.query(models.PageText.page_hash).filter(models.PageText.page_hash.in_(list(pages))).all()}
+        rows = [
+            {"page_hash": page_hash, "method": method, "text": text}
+            for page_hash, (method, text) in pages.items()
+            if page_hash not in existing
+        ]
+        try:
+            if rows:
+                db.execute(models.PageText.__table__.insert(), rows)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+    finally:
+        db.close()
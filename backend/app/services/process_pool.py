@@ -0,0 +1,21 @@
+"""Lazily started process pools for CPU-bound work run from the API process."""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+class SpawnPool:
+    """A ProcessPoolExecutor that is only started the first time it is needed."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the API process has live threads and DB connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
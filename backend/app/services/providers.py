@@ -0,0 +1,173 @@
+"""LLM providers behind the generation pipeline.
+
+A provider turns (model, prompt) into a Completion. LLM_PROVIDER selects
+the implementation: "groq" (default) calls the Groq API; "fake" answers
+locally with schema-valid question JSON, so generation can be benchmarked
+and load-tested without network access or an API key.
+
+Fake provider settings:
+    FAKE_LLM_LATENCY_MS       mean latency per call (default 200)
+    FAKE_LLM_JITTER_MS        uniform +/- jitter around the mean (default 50)
+    FAKE_LLM_ERROR_RATE       fraction of calls failing with a 503 (default 0)
+    FAKE_LLM_TRUNCATION_RATE  fraction of calls cut off mid-JSON (default 0)
+    FAKE_LLM_FAILING_MODELS   comma-separated models that always fail
+    FAKE_LLM_SEED             seed for the pseudo-random choices (default 0)
+"""
+from typing import Optional
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+FAKE_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "50"))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_TRUNCATION_RATE = float(os.getenv("FAKE_LLM_TRUNCATION_RATE", "0"))
+FAKE_FAILING_MODELS = {model.strip() for model in os.getenv("FAKE_LLM_FAILING_MODELS", "").split(",") if model.strip()}
+FAKE_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+class Completion:
+    __slots__ = ("text", "finish_reason", "prompt_tokens", "completion_tokens", "total_tokens")
+
+    def __init__(self, text: str, finish_reason: Optional[str], prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None, total_tokens: Optional[int] = None):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+
+class ProviderError(Exception):
+    """Provider failure carrying an HTTP-like status, as the Groq SDK's errors do."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = None
+
+class GroqProvider:
+    name = "groq"
+
+    def __init__(self):
+        # Imported here so the API starts without loading the SDK
+        from groq import AsyncGroq
+
+        # Retries and backoff are handled by the caller against the shared rate limiter
+        self._client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0)
+
+    async def __aenter__(self):
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.__aexit__(*exc_info)
+
+    async def complete(self, model: str, prompt: str, max_tokens: int) -> Completion:
+        chat_completion = await self._client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=model,
+            response_format={"type": "json_object"},
+            max_tokens=max_tokens,
+        )
+        choice = chat_completion.choices[0]
+        usage = chat_completion.usage
+        return Completion(
+            choice.message.content,
+            choice.finish_reason,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+            getattr(usage, "total_tokens", None),
+        )
+
+_REQUESTED = re.compile(r"EXACTLY (\d+)")
+_WORD = re.compile(r"[A-Za-z]{4,}")
+
+class FakeProvider:
+    """Deterministic local stand-in that answers build_prompt() prompts."""
+
+    name = "fake"
+    _calls = 0
+    _calls_lock = threading.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    @classmethod
+    def _next_call(cls) -> int:
+        with cls._calls_lock:
+            cls._calls += 1
+            return cls._calls
+
+    async def complete(self, model: str, prompt: str, max_tokens: int) -> Completion:
+        call = self._next_call()
+        seed = hashlib.sha256(f"{FAKE_SEED}|{call}|{model}|{prompt}".encode("utf-8")).digest()
+        rng = random.Random(seed)
+
+        await asyncio.sleep(max(0.0, FAKE_LATENCY_MS + rng.uniform(-FAKE_JITTER_MS, FAKE_JITTER_MS)) / 1000)
+        if model in FAKE_FAILING_MODELS:
+            raise ProviderError(f"The model `{model}` has been decommissioned", 404)
+        if rng.random() < FAKE_ERROR_RATE:
+            raise ProviderError("Service unavailable (fake)", 503)
+
+        counts = [int(n) for n in _REQUESTED.findall(prompt)[:3]]
+        num_mcqs, num_short, num_flashcards = (counts + [0, 0, 0])[:3]
+        words = _WORD.findall(prompt.split("Text content:", 1)[-1]) or ["concept", "passage", "section"]
+        tag = seed.hex()[:8]
+
+        def topic(n: int) -> str:
+            return " ".join(rng.choice(words).lower() for _ in range(3)) + f" {tag}{n}"
+
+        payload = {
+            "mcqs": [
+                {
+                    "question": f"Which statement about {topic(n)} is correct?",
+                    "options": [f"Option {letter}: {topic(n)}" for letter in "ABCD"],
+                }
+                for n in range(num_mcqs)
+            ],
+            "short_questions": [
+                {"question": f"Explain the role of {topic(n)}.", "answer": f"It relates to {topic(n)}."}
+                for n in range(num_short)
+            ],
+            "flashcards": [
+                {"front": f"Define {topic(n)}", "back": f"The meaning of {topic(n)}."}
+                for n in range(num_flashcards)
+            ],
+        }
+        for mcq in payload["mcqs"]:
+            mcq["correct_answer"] = rng.choice(mcq["options"])
+
+        text = json.dumps(payload)
+        finish_reason = "stop"
+        if rng.random() < FAKE_TRUNCATION_RATE:
+            text = text[:len(text) // 2]
+            finish_reason = "length"
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(text) // 4
+        return Completion(text, finish_reason, prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+
+PROVIDERS = {
+    "groq": GroqProvider,
+    "fake": FakeProvider,
+}
+
+def create(name: Optional[str] = None):
+    """New provider instance for one generation; use it as an async context manager."""
+    name = (name or LLM_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
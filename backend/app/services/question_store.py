@@ -0,0 +1,113 @@
+from typing import List
+import json
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .. import models
+
+def question_rows(generated_data: dict, difficulty: str, question_set_id: int) -> List[dict]:
+    """Flatten generated MCQs, short questions and flashcards into Question rows."""
+    rows = []
+    for mcq in generated_data.get("mcqs", []):
+        rows.append({
+            "question_text": mcq["question"],
+            "question_type": "MCQ",
+            "options": json.dumps(mcq["options"]),
+            "correct_answer": mcq["correct_answer"],
+            "difficulty": difficulty,
+            "question_set_id": question_set_id,
+        })
+
+    for short in generated_data.get("short_questions", []):
+        rows.append({
+            "question_text": short["question"],
+            "question_type": "SHORT",
+            "options": None,
+            "correct_answer": short["answer"],
+            "difficulty": difficulty,
+            "question_set_id": question_set_id,
+        })
+
+    for flashcard in generated_data.get("flashcards", []):
+        rows.append({
+            "question_text": flashcard["front"],
+            "question_type": "FLASHCARD",
+            "options": None,
+            "correct_answer": flashcard["back"],
+            "difficulty": difficulty,
+            "question_set_id": question_set_id,
+        })
+    return rows
+
+def _insert_questions(db: Session, generated_data: dict, difficulty: str, question_set_id: int) -> int:
+    rows = question_rows(generated_data, difficulty, question_set_id)
+    if rows:
+        # One executemany instead of an ORM object and INSERT per question
+        db.execute(models.Question.__table__.insert(), rows)
+    return len(rows)
+
+def create_question_set(db: Session, chapter: models.Chapter, owner_id: int, params: dict, generated_data: dict = None) -> models.QuestionSet:
+    """Insert a question set and its questions in a single transaction."""
+    num_mcqs = params["num_mcqs"]
+    num_short = params["num_short"]
+    num_flashcards = params["num_flashcards"]
+    is_exam = params["is_exam"]
+
+    time_limit = int(num_mcqs / 2) if is_exam else None
+    is_flashcard = num_flashcards > 0 and num_mcqs == 0 and num_short == 0
+
+    question_set = models.QuestionSet(
+        title=f"Exam: {chapter.title}" if is_exam else f"Flashcards: {chapter.title}" if is_flashcard else f"Questions for {chapter.title}",
+        owner_id=owner_id,
+        chapter_id=chapter.id,
+        is_exam=is_exam,
+        is_flashcard=is_flashcard,
+        time_limit=time_limit
+    )
+    try:
+        db.add(question_set)
+        db.flush() # Assigns question_set.id without committing
+        if generated_data:
+            _insert_questions(db, generated_data, params["difficulty"], question_set.id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return question_set
+
+def add_questions(db: Session, question_set_id: int, generated_data: dict, difficulty: str) -> int:
+    """Append a batch of generated questions to an existing set in one transaction."""
+    try:
+        count = _insert_questions(db, generated_data, difficulty, question_set_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return count
+
+def delete_question_set(db: Session, question_set_id: int):
+    """Delete a set and its questions in one transaction."""
+    try:
+        db.query(models.Question).filter(models.Question.question_set_id == question_set_id).delete(synchronize_session=False)
+        db.query(models.QuestionSet).filter(models.QuestionSet.id == question_set_id).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def content_version(db: Session, question_set_id: int) -> str:
+    """Identify the current contents of a set without loading its questions.
+
+    Questions are only appended while a set exists, so (count, highest id)
+    changes exactly when the set does. Ids are not unique over time: after a
+    set is deleted SQLite hands the same set and question ids out again, so
+    the set's creation time is part of the version too, and a new set never
+    inherits the cached answer key or exports of a deleted one.
+    """
+    row = db.query(models.QuestionSet.created_at, func.count(models.Question.id), func.max(models.Question.id)).outerjoin(
+        models.Question, models.Question.question_set_id == models.QuestionSet.id
+    ).filter(models.QuestionSet.id == question_set_id).group_by(models.QuestionSet.id).first()
+    if row is None:
+        return "0-0"
+    created_at, count, last_id = row
+    return f"{created_at.isoformat() if created_at else ''}-{count}-{last_id or 0}"
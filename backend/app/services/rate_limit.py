@@ -0,0 +1,140 @@
+"""Process-wide request and token rate limits for LLM calls.
+
+Each model gets a requests/min and a tokens/min token bucket, shared by
+every generation in the process (job workers, streams), whichever thread
+or event loop they run on. Callers reserve an estimate before a call and
+reconcile it with the reported usage afterwards. A 429 pauses the model
+until its retry-after has passed.
+"""
+from typing import Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import threading
+import time
+
+# Defaults per model; LLM_RATE_LIMITS overrides them, e.g. {"llama-3.1-8b-instant": [30, 20000]}
+DEFAULT_RPM = int(os.getenv("LLM_RPM", "30"))
+DEFAULT_TPM = int(os.getenv("LLM_TPM", "12000"))
+RATE_LIMIT_OVERRIDES = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+
+class TokenBucket:
+    """Bucket of `capacity` units refilled continuously over one minute. Not locked; ModelLimiter locks."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # Requests bigger than the bucket wait for a full bucket and go into debt
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+class ModelLimiter:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, estimated_tokens: int) -> float:
+        """Reserve one request and estimated_tokens, or return how long to wait first."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(estimated_tokens, now),
+            )
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(estimated_tokens)
+            return wait
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        with self._lock:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+    def penalize(self, retry_after: float):
+        with self._lock:
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            # The provider disagrees with our count; assume the bucket is empty
+            self.tokens.tokens = min(self.tokens.tokens, 0.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "requests_available": round(self.requests.tokens, 1),
+                "tokens_available": round(self.tokens.tokens),
+                "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+                "rate_limited": self.rate_limited,
+            }
+
+class RateLimiter:
+    def __init__(self, default_rpm: int, default_tpm: int, overrides: Dict[str, Tuple[int, int]]):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.overrides = overrides
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._models.get(model)
+            if limiter is None:
+                rpm, tpm = self.overrides.get(model, (self.default_rpm, self.default_tpm))
+                limiter = self._models[model] = ModelLimiter(rpm, tpm)
+            return limiter
+
+    async def acquire(self, model: str, estimated_tokens: int, max_wait: Optional[float] = None) -> bool:
+        """Wait for capacity on model. Returns False without reserving if that would take longer than max_wait."""
+        limiter = self.model(model)
+        waited = 0.0
+        while True:
+            wait = limiter.try_acquire(estimated_tokens)
+            if wait <= 0:
+                return True
+            if max_wait is not None and waited + wait > max_wait:
+                return False
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def reconcile(self, model: str, estimated_tokens: int, actual_tokens: int):
+        self.model(model).reconcile(estimated_tokens, actual_tokens)
+
+    def penalize(self, model: str, retry_after: float):
+        self.model(model).penalize(retry_after)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = dict(self._models)
+        return {model: limiter.snapshot() for model, limiter in models.items()}
+
+limiter = RateLimiter(DEFAULT_RPM, DEFAULT_TPM, {model: tuple(limits) for model, limits in RATE_LIMIT_OVERRIDES.items()})
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+def retry_after(error: Exception, default: float = 2.0) -> float:
+    """Seconds to back off after a 429, from the response's retry-after header."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else default
+    except ValueError:
+        return default
@@ -0,0 +1,153 @@
+"""Progress analytics kept up to date as attempts are recorded.
+
+record_attempt folds a new attempt into the user's UserStats row and the
+(user, question set) QuestionSetStats row inside the caller's transaction,
+so reading progress never scans attempt history. Both rows are read with
+SELECT ... FOR UPDATE, so concurrent attempts by the same user queue on
+them instead of overwriting each other's counts (on SQLite the attempt's
+INSERT, flushed first, already holds the database write lock). rebuild recomputes both
+tables from the attempts themselves, for backfills and after regrading.
+"""
+from typing import Dict, Iterable, Optional
+import json
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .. import models
+from . import grading
+
+REBUILD_BATCH_SIZE = 500
+
+def _new_user_stats(user_id: int) -> models.UserStats:
+    return models.UserStats(user_id=user_id, attempt_count=0, question_sets_attempted=0, total_score=0, total_questions=0)
+
+def _new_set_stats(user_id: int, question_set_id: int) -> models.QuestionSetStats:
+    return models.QuestionSetStats(
+        user_id=user_id, question_set_id=question_set_id, attempt_count=0,
+        best_score=0, last_score=0, total_score=0, total_questions=0, error_counts="{}",
+    )
+
+def _locked(db: Session, model, **keys):
+    # populate_existing: the values must be the ones read under the lock, not an older identity-map copy
+    return db.query(model).filter_by(**keys).with_for_update().populate_existing()
+
+def _get_or_create_locked(db: Session, model, factory, **keys):
+    """The row for keys, locked until the caller's transaction ends; created if missing."""
+    row = _locked(db, model, **keys).first()
+    if row is not None:
+        return row
+    row = factory()
+    try:
+        with db.begin_nested():
+            db.add(row)
+    except IntegrityError: # Created concurrently by another attempt
+        row = _locked(db, model, **keys).one()
+    return row
+
+def _fold(user_stats: models.UserStats, set_stats: models.QuestionSetStats, attempt: models.ExamAttempt, results: Dict[str, bool], error_counts: Dict[str, int]):
+    if set_stats.attempt_count == 0:
+        user_stats.question_sets_attempted += 1
+    user_stats.attempt_count += 1
+    user_stats.total_score += attempt.score
+    user_stats.total_questions += attempt.total_questions
+    user_stats.last_attempt_at = attempt.completed_at
+
+    set_stats.best_score = attempt.score if set_stats.attempt_count == 0 else max(set_stats.best_score, attempt.score)
+    set_stats.attempt_count += 1
+    set_stats.last_score = attempt.score
+    set_stats.total_score += attempt.score
+    set_stats.total_questions = attempt.total_questions
+    set_stats.last_attempt_id = attempt.id
+    set_stats.last_attempt_at = attempt.completed_at
+    for question_id, correct in results.items():
+        if not correct:
+            error_counts[question_id] = error_counts.get(question_id, 0) + 1
+
+def record_attempt(db: Session, attempt: models.ExamAttempt, results: Dict[str, bool]):
+    """Fold a flushed, graded attempt into the stats tables. The caller commits."""
+    # Always user row first, then set row, so two attempts cannot lock them in opposite orders
+    user_stats = _get_or_create_locked(db, models.UserStats, lambda: _new_user_stats(attempt.user_id), user_id=attempt.user_id)
+    set_stats = _get_or_create_locked(
+        db, models.QuestionSetStats, lambda: _new_set_stats(attempt.user_id, attempt.question_set_id),
+        user_id=attempt.user_id, question_set_id=attempt.question_set_id,
+    )
+    error_counts = json.loads(set_stats.error_counts or "{}")
+    _fold(user_stats, set_stats, attempt, results, error_counts)
+    set_stats.error_counts = json.dumps(error_counts)
+
+def rebuild(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute stats from stored attempts, for all users or just user_ids. The caller commits.
+
+    Error counts are regraded against the sets' current answer keys. Returns
+    the number of attempts folded.
+    """
+    stats_filter = [] if user_ids is None else [models.UserStats.user_id.in_(list(user_ids))]
+    set_stats_filter = [] if user_ids is None else [models.QuestionSetStats.user_id.in_(list(user_ids))]
+    db.query(models.UserStats).filter(*stats_filter).delete(synchronize_session=False)
+    db.query(models.QuestionSetStats).filter(*set_stats_filter).delete(synchronize_session=False)
+
+    query = db.query(models.ExamAttempt).filter(models.ExamAttempt.question_set_id.isnot(None))
+    if user_ids is not None:
+        query = query.filter(models.ExamAttempt.user_id.in_(list(user_ids)))
+    query = query.order_by(models.ExamAttempt.completed_at, models.ExamAttempt.id)
+
+    user_rows = {}
+    set_rows = {}
+    error_counts = {}
+    folded = 0
+    batch = []
+
+    def fold_batch():
+        graded = grading.grade_many(db, [(attempt.question_set_id, json.loads(attempt.answers or "{}")) for attempt in batch])
+        for attempt, (_, _, results) in zip(batch, graded):
+            user_stats = user_rows.get(attempt.user_id)
+            if user_stats is None:
+                user_stats = user_rows[attempt.user_id] = _new_user_stats(attempt.user_id)
+            key = (attempt.user_id, attempt.question_set_id)
+            set_stats = set_rows.get(key)
+            if set_stats is None:
+                set_stats = set_rows[key] = _new_set_stats(*key)
+                error_counts[key] = {}
+            _fold(user_stats, set_stats, attempt, results, error_counts[key])
+        batch.clear()
+
+    for attempt in query.yield_per(REBUILD_BATCH_SIZE):
+        batch.append(attempt)
+        folded += 1
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            fold_batch()
+    if batch:
+        fold_batch()
+
+    for key, set_stats in set_rows.items():
+        set_stats.error_counts = json.dumps(error_counts[key])
+    db.add_all(list(user_rows.values()) + list(set_rows.values()))
+    db.flush()
+    return folded
+
+def summary(db: Session, user_id: int, question_set_id: Optional[int] = None) -> dict:
+    user_stats = db.query(models.UserStats).filter(models.UserStats.user_id == user_id).first() or _new_user_stats(user_id)
+    query = db.query(models.QuestionSetStats).filter(models.QuestionSetStats.user_id == user_id)
+    if question_set_id is not None:
+        query = query.filter(models.QuestionSetStats.question_set_id == question_set_id)
+
+    return {
+        "attempt_count": user_stats.attempt_count,
+        "question_sets_attempted": user_stats.question_sets_attempted,
+        "average_percent": round(100 * user_stats.total_score / user_stats.total_questions, 1) if user_stats.total_questions else None,
+        "last_attempt_at": user_stats.last_attempt_at,
+        "question_sets": [
+            {
+                "question_set_id": row.question_set_id,
+                "attempt_count": row.attempt_count,
+                "best_score": row.best_score,
+                "last_score": row.last_score,
+                "average_score": round(row.total_score / row.attempt_count, 2) if row.attempt_count else None,
+                "total_questions": row.total_questions,
+                "error_counts": json.loads(row.error_counts or "{}"),
+                "last_attempt_id": row.last_attempt_id,
+                "last_attempt_at": row.last_attempt_at,
+            }
+            for row in query.order_by(models.QuestionSetStats.last_attempt_at.desc()).all()
+        ],
+    }
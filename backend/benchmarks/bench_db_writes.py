@@ -0,0 +1,95 @@
+"""Concurrent write benchmark for the database layer.
+
+Several writer threads each insert exam attempts in their own short
+transactions, the shape of attempt submissions and generation writes.
+Reports writes/sec for the tuned engine from app.database.make_engine.
+For SQLite it also reports an untuned baseline (default journaling, no
+pragmas).
+
+    cd backend
+    python -m benchmarks.bench_db_writes --writers 8 --duration 5
+    python -m benchmarks.bench_db_writes --url postgresql://user:pw@localhost/scratch
+
+Point --url only at a scratch database: tables are created if missing and
+the benchmark's own rows are deleted afterwards.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models
+
+def run_writers(engine, writers: int, duration: float) -> dict:
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    user = models.User(email=f"bench-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    counts = [0] * writers
+    errors = [0] * writers
+    deadline = time.perf_counter() + duration
+
+    def writer(n: int):
+        db = Session()
+        try:
+            while time.perf_counter() < deadline:
+                db.add(models.ExamAttempt(user_id=user_id, question_set_id=None, score=1, total_questions=1, answers=json.dumps({"1": "A"})))
+                try:
+                    db.commit()
+                    counts[n] += 1
+                except Exception:
+                    db.rollback()
+                    errors[n] += 1
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = Session()
+    db.query(models.ExamAttempt).filter(models.ExamAttempt.user_id == user_id).delete(synchronize_session=False)
+    db.query(models.User).filter(models.User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    return {"writes": sum(counts), "errors": sum(errors), "seconds": elapsed, "writes_per_sec": sum(counts) / elapsed}
+
+def report(label: str, result: dict):
+    print(f"{label:<22} {result['writes_per_sec']:>10.1f} writes/sec  ({result['writes']} writes, {result['errors']} errors, {result['seconds']:.1f}s)")
+
+def main(url: str, writers: int, duration: float):
+    print(f"writers: {writers}, duration: {duration}s")
+    if url:
+        report(url.split(":", 1)[0], run_writers(database.make_engine(url), writers, duration))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_url = f"sqlite:///{os.path.join(tmp, 'baseline.db')}"
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        report("sqlite (untuned)", run_writers(database.make_engine(baseline_url, tune_sqlite=False), writers, duration))
+        report("sqlite (WAL, tuned)", run_writers(database.make_engine(tuned_url), writers, duration))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Database URL to benchmark; defaults to tuned vs untuned temporary SQLite")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    main(args.url, args.writers, args.duration)
@@ -0,0 +1,299 @@
+"""End-to-end API benchmark.
+
+Boots main.app in-process (httpx ASGITransport) against a fresh, seeded
+SQLite database in a temporary directory. LLM calls go to the local fake
+provider. Each workload is driven at a fixed concurrency for a fixed
+duration, and the report gives requests, errors, throughput and
+p50/p95/p99 latency per endpoint. Results are written as JSON. Pass
+--compare with an earlier results file to print the change per endpoint.
+
+    cd backend
+    python -m benchmarks.bench_e2e --users 20 --concurrency 16 --duration 10
+    python -m benchmarks.bench_e2e --workloads list,attempt --compare benchmarks/results/e2e-abc1234.json
+
+Workloads:
+    upload    POST /upload/chapter with a unique text file
+    generate  POST /generate/{chapter_id}; also times the job until it completes
+    list      GET /chapters/, /questionsets/, /attempts/user/, /attempts/stats
+    export    GET /export/{question_set_id}/{pdf,docx,txt}
+    attempt   POST /attempts/ with a full answer sheet
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+WORKLOADS = ("upload", "generate", "list", "export", "attempt")
+
+CHAPTER_TEXT = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "It takes place in the chloroplasts, where chlorophyll absorbs mostly blue and red light. "
+    "The light-dependent reactions split water and release oxygen, while the Calvin cycle fixes carbon dioxide.\n\n"
+) * 40
+
+def configure_environment(workdir: str, fake_latency_ms: float):
+    """Point the app at a scratch database, the fake LLM and scratch directories.
+
+    Settings are read when app modules are imported, so this runs first.
+    Values already in the environment (or a .env file, which does not
+    override them) are replaced, so a shell exporting a real DATABASE_URL or
+    GROQ_API_KEY can never point the benchmark at production data or the
+    paid API.
+    """
+    settings = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "EXPORT_CACHE_DIR": os.path.join(workdir, "export_cache"),
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MS": str(fake_latency_ms),
+        # Measure the app, not the shared quota
+        "LLM_RPM": "1000000",
+        "LLM_TPM": "1000000000",
+        "BCRYPT_ROUNDS": "4",
+        "GROQ_API_KEY": "unused",
+    }
+    os.environ.update(settings)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def seed(users: int, chapters_per_user: int, sets_per_user: int, questions_per_set: int, attempts_per_user: int) -> list:
+    """Insert users, chapters, question sets and attempts in bulk. Returns per-user fixtures."""
+    from app import auth, database, migrations, models
+    from app.services import question_store, stats
+
+    migrations.upgrade(database.engine)
+    db = database.SessionLocal()
+    hashed = auth.get_password_hash("password")
+    fixtures = []
+    params = {"num_mcqs": questions_per_set, "num_short": 0, "num_flashcards": 0, "is_exam": True, "difficulty": "Medium"}
+    for n in range(users):
+        user = models.User(email=f"bench{n}@example.com", hashed_password=hashed, is_active=True)
+        db.add(user)
+        db.flush()
+
+        chapters = []
+        for c in range(chapters_per_user):
+            chapter = models.Chapter(title=f"Chapter {c}", content_text=CHAPTER_TEXT, owner_id=user.id, status="ready")
+            db.add(chapter)
+            chapters.append(chapter)
+        db.commit()
+
+        question_sets = []
+        for s in range(sets_per_user):
+            generated = {"mcqs": [
+                {"question": f"Question {q} of set {s}?", "options": [f"Answer {q}.{o}" for o in range(4)], "correct_answer": f"Answer {q}.{q % 4}"}
+                for q in range(questions_per_set)
+            ]}
+            question_set = question_store.create_question_set(db, chapters[s % len(chapters)], user.id, params, generated)
+            answer_sheet = {
+                str(question_id): json.loads(options)[0]
+                for question_id, options in db.query(models.Question.id, models.Question.options).filter(models.Question.question_set_id == question_set.id)
+            }
+            question_sets.append((question_set.id, answer_sheet))
+
+        db.execute(models.ExamAttempt.__table__.insert(), [
+            {
+                "user_id": user.id,
+                "question_set_id": question_sets[a % len(question_sets)][0],
+                "score": 0,
+                "total_questions": questions_per_set,
+                "answers": json.dumps(question_sets[a % len(question_sets)][1]),
+                "completed_at": datetime.utcnow() - timedelta(minutes=a),
+            }
+            for a in range(attempts_per_user)
+        ])
+        db.commit()
+
+        token = auth.create_access_token({"sub": user.email, "uid": user.id}, expires_delta=timedelta(hours=6))
+        fixtures.append({
+            "headers": {"Authorization": f"Bearer {token}"},
+            "chapter_ids": [chapter.id for chapter in chapters],
+            "question_sets": question_sets,
+        })
+
+    stats.rebuild(db)
+    db.commit()
+    db.close()
+    return fixtures
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool):
+        self.latencies[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+    async def timed(self, label: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.record(label, time.perf_counter() - started, ok)
+        return response
+
+async def upload_workload(client, user, recorder: Recorder, rng: random.Random, counter):
+    n = next(counter)
+    content = f"Benchmark upload {n} {rng.random()}\n\n{CHAPTER_TEXT}".encode("utf-8")
+    await recorder.timed("POST /upload/chapter", client.post(
+        "/upload/chapter", params={"title": f"Upload {n}"}, headers=user["headers"],
+        files={"file": (f"upload-{n}.txt", content, "text/plain")},
+    ))
+
+async def generate_workload(client, user, recorder: Recorder, rng: random.Random, counter):
+    chapter_id = rng.choice(user["chapter_ids"])
+    started = time.perf_counter()
+    response = await recorder.timed("POST /generate/{chapter_id}", client.post(
+        f"/generate/{chapter_id}", params={"num_mcqs": 10, "num_short": 5, "fresh": "true"}, headers=user["headers"],
+    ))
+    if response is None or response.status_code >= 400:
+        return
+    job_id = response.json()["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}", headers=user["headers"])).json()
+        if job["status"] in ("completed", "failed"):
+            recorder.record("generation job (end to end)", time.perf_counter() - started, job["status"] == "completed")
+            return
+        await asyncio.sleep(0.05)
+
+async def list_workload(client, user, recorder: Recorder, rng: random.Random, counter):
+    path = rng.choice(["/chapters/", "/questionsets/", "/attempts/user/", "/attempts/stats"])
+    await recorder.timed(f"GET {path}", client.get(path, headers=user["headers"]))
+
+async def export_workload(client, user, recorder: Recorder, rng: random.Random, counter):
+    question_set_id, _ = rng.choice(user["question_sets"])
+    format = rng.choice(["pdf", "docx", "txt"])
+    await recorder.timed(f"GET /export/{{id}}/{format}", client.get(
+        f"/export/{question_set_id}/{format}", params={"include_answers": rng.random() < 0.5}, headers=user["headers"],
+    ))
+
+async def attempt_workload(client, user, recorder: Recorder, rng: random.Random, counter):
+    question_set_id, answer_sheet = rng.choice(user["question_sets"])
+    await recorder.timed("POST /attempts/", client.post(
+        "/attempts/", json={"question_set_id": question_set_id, "answers": answer_sheet}, headers=user["headers"],
+    ))
+
+WORKLOAD_FUNCTIONS = {
+    "upload": upload_workload,
+    "generate": generate_workload,
+    "list": list_workload,
+    "export": export_workload,
+    "attempt": attempt_workload,
+}
+
+async def drive(app, fixtures: list, workload: str, concurrency: int, duration: float) -> Recorder:
+    import httpx
+    import itertools
+
+    recorder = Recorder()
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker(worker_id: int):
+            rng = random.Random(worker_id)
+            while time.perf_counter() < deadline:
+                await WORKLOAD_FUNCTIONS[workload](client, fixtures[worker_id % len(fixtures)], recorder, rng, counter)
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return recorder
+
+def summarize(recorder: Recorder, duration: float) -> dict:
+    return {
+        label: {
+            "requests": len(latencies),
+            "errors": recorder.errors[label],
+            "throughput_per_sec": round(len(latencies) / duration, 2),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        for label, latencies in sorted(recorder.latencies.items())
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"{'endpoint':<32} {'reqs':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, row in results.items():
+        line = f"{label:<32} {row['requests']:>7} {row['errors']:>5} {row['throughput_per_sec']:>9.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        before = (baseline or {}).get(label)
+        if before and before["p95_ms"] and before["throughput_per_sec"]:
+            line += f"   p95 {100 * (row['p95_ms'] / before['p95_ms'] - 1):+.0f}%  req/s {100 * (row['throughput_per_sec'] / before['throughput_per_sec'] - 1):+.0f}%"
+        print(line)
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args.fake_latency_ms)
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        import main as app_main
+
+        # ASGITransport does not send lifespan events; seed() applies the schema that startup would
+        fixtures = seed(args.users, args.chapters, args.sets, args.questions, args.attempts)
+        print(f"seeded {args.users} users x ({args.chapters} chapters, {args.sets} sets of {args.questions} questions, {args.attempts} attempts)")
+
+        results = {}
+        for workload in args.workloads:
+            recorder = asyncio.run(drive(app_main.app, fixtures, workload, args.concurrency, args.duration))
+            results.update(summarize(recorder, args.duration))
+
+        # Let queued export prewarms finish before the scratch directory goes away
+        from app.services import export_cache
+        export_cache._executor.shutdown(wait=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    commit = git_commit()
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"e2e-{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "results": results,
+        }, f, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--chapters", type=int, default=3, help="Chapters per user")
+    parser.add_argument("--sets", type=int, default=5, help="Question sets per user")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per set")
+    parser.add_argument("--attempts", type=int, default=50, help="Attempts per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per workload")
+    parser.add_argument("--workloads", type=lambda value: [w for w in value.split(",") if w], default=list(WORKLOADS), help=f"Comma-separated subset of {','.join(WORKLOADS)}")
+    parser.add_argument("--fake-latency-ms", type=float, default=200.0, help="Mean latency of the fake LLM provider")
+    parser.add_argument("--output", default=None, help="Results JSON path (default benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+    main(args)
@@ -0,0 +1,101 @@
+"""Grading throughput benchmark.
+
+Seeds a throwaway SQLite database with question sets and reports
+attempts graded per second for:
+
+  cold    every attempt rebuilds its answer key (cache cleared each time)
+  warm    one attempt at a time with the answer-key cache hot
+  batch   grade_many over all attempts at once, as /attempts/grade and
+          /attempts/regrade do
+
+    cd backend
+    python -m benchmarks.bench_grading --sets 20 --questions 50 --attempts 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import grading
+
+def seed(Session, sets: int, questions: int):
+    db = Session()
+    user = models.User(email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    keys = {}
+    for n in range(sets):
+        question_set = models.QuestionSet(title=f"Set {n}", owner_id=user.id, is_exam=True)
+        db.add(question_set)
+        db.flush()
+        rows = []
+        for i in range(questions):
+            options = [f"Option {c} for question {i}" for c in "ABCD"]
+            if i % 5 == 4:
+                rows.append({"question_text": f"Q{i}", "question_type": "SHORT", "options": None, "correct_answer": f"The answer to {i}.", "difficulty": "Medium", "question_set_id": question_set.id})
+            else:
+                rows.append({"question_text": f"Q{i}", "question_type": "MCQ", "options": json.dumps(options), "correct_answer": options[i % 4], "difficulty": "Medium", "question_set_id": question_set.id})
+        db.execute(models.Question.__table__.insert(), rows)
+        db.flush()
+        keys[question_set.id] = db.query(models.Question.id, models.Question.question_type, models.Question.options).filter(models.Question.question_set_id == question_set.id).all()
+    db.commit()
+    db.close()
+    return keys
+
+def make_attempts(keys, attempts: int):
+    rng = random.Random(0)
+    set_ids = list(keys)
+    submissions = []
+    for _ in range(attempts):
+        question_set_id = rng.choice(set_ids)
+        answers = {}
+        for question_id, question_type, options in keys[question_set_id]:
+            answers[str(question_id)] = rng.choice(json.loads(options)) if question_type == "MCQ" else "the answer to 1"
+        submissions.append((question_set_id, answers))
+    return submissions
+
+def timed(label: str, count: int, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {count / elapsed:>10.0f} attempts/sec  ({elapsed * 1000:.0f} ms for {count})")
+
+def main(sets: int, questions: int, attempts: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        submissions = make_attempts(seed(Session, sets, questions), attempts)
+        print(f"sets: {sets}, questions/set: {questions}, attempts: {attempts}")
+
+        db = Session()
+        cold_count = min(attempts, 500)
+
+        def cold():
+            for question_set_id, answers in submissions[:cold_count]:
+                grading.answer_keys.clear()
+                grading.grade(db, question_set_id, answers)
+
+        def warm():
+            for question_set_id, answers in submissions:
+                grading.grade(db, question_set_id, answers)
+
+        timed("cold", cold_count, cold)
+        timed("warm", attempts, warm)
+        timed("batch", attempts, lambda: grading.grade_many(db, submissions))
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.sets, args.questions, args.attempts)
@@ -0,0 +1,108 @@
+"""Login throughput benchmark.
+
+Runs the auth router in-process against a throwaway SQLite database and
+drives POST /token at a fixed concurrency for a fixed duration. It reports
+sustained logins/sec for this single worker process, plus the latency of a
+cheap probe request issued during the storm. That probe shows whether
+bcrypt is stalling the event loop.
+
+    cd backend
+    BCRYPT_ROUNDS=10 python -m benchmarks.bench_login --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, database, models
+from app.routers import auth as auth_router
+
+def build_app(db_path: str, users: int) -> FastAPI:
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Hash once; every seeded user shares the password
+    hashed = auth.get_password_hash("password")
+    db = Session()
+    db.execute(models.User.__table__.insert(), [{"email": f"user{i}@example.com", "hashed_password": hashed, "is_active": True} for i in range(users)])
+    db.commit()
+    db.close()
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(auth_router.router)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.dependency_overrides[database.get_db] = get_db
+    return app
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run(concurrency: int, duration: float, users: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, "bench.db"), users)
+        transport = httpx.ASGITransport(app=app)
+        login_latencies = []
+        probe_latencies = []
+        failures = 0
+        deadline = time.perf_counter() + duration
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def login_worker(worker_id: int):
+                nonlocal failures
+                i = worker_id
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    response = await client.post("/token", data={"username": f"user{i % users}@example.com", "password": "password"})
+                    login_latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        failures += 1
+                    i += concurrency
+
+            async def probe():
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    await client.get("/ping")
+                    probe_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.05)
+
+            started = time.perf_counter()
+            await asyncio.gather(probe(), *(login_worker(n) for n in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    print(f"bcrypt rounds:        {auth.BCRYPT_ROUNDS}")
+    print(f"hash workers:         {auth.PASSWORD_HASH_WORKERS}")
+    print(f"concurrency:          {concurrency}")
+    print(f"logins:               {len(login_latencies)} ({failures} failed) in {elapsed:.1f}s")
+    print(f"logins/sec (1 worker): {len(login_latencies) / elapsed:.1f}")
+    print(f"login p50/p95:        {statistics.median(login_latencies) * 1000:.0f} / {percentile(login_latencies, 95) * 1000:.0f} ms")
+    print(f"probe p50/p95:        {statistics.median(probe_latencies) * 1000:.1f} / {percentile(probe_latencies, 95) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.duration, args.users))
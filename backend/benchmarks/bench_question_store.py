@@ -0,0 +1,84 @@
+"""Benchmark persisting generated question sets.
+
+Compares the old one-ORM-object-per-question path against
+question_store.create_question_set on a throwaway SQLite database.
+
+    cd backend
+    python -m benchmarks.bench_question_store --sizes 1000 5000 --repeat 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import question_store
+
+PARAMS = {"num_mcqs": 0, "num_short": 0, "num_flashcards": 0, "is_exam": False, "difficulty": "Medium"}
+
+def make_generated(n: int) -> dict:
+    third = n // 3
+    return {
+        "mcqs": [{"question": f"Question {i}?", "options": ["A", "B", "C", "D"], "correct_answer": "A"} for i in range(n - 2 * third)],
+        "short_questions": [{"question": f"Short {i}?", "answer": "Answer"} for i in range(third)],
+        "flashcards": [{"front": f"Term {i}", "back": "Definition"} for i in range(third)],
+    }
+
+def save_per_row(db, chapter, owner_id, generated_data):
+    """The pre-bulk path: commit the set, then one db.add() per question."""
+    question_set = models.QuestionSet(title="bench", owner_id=owner_id, chapter_id=chapter.id)
+    db.add(question_set)
+    db.commit()
+    db.refresh(question_set)
+    for mcq in generated_data["mcqs"]:
+        db.add(models.Question(question_text=mcq["question"], question_type="MCQ", options=json.dumps(mcq["options"]), correct_answer=mcq["correct_answer"], difficulty="Medium", question_set_id=question_set.id))
+    for short in generated_data["short_questions"]:
+        db.add(models.Question(question_text=short["question"], question_type="SHORT", correct_answer=short["answer"], difficulty="Medium", question_set_id=question_set.id))
+    for flashcard in generated_data["flashcards"]:
+        db.add(models.Question(question_text=flashcard["front"], question_type="FLASHCARD", correct_answer=flashcard["back"], difficulty="Medium", question_set_id=question_set.id))
+    db.commit()
+
+def save_bulk(db, chapter, owner_id, generated_data):
+    question_store.create_question_set(db, chapter, owner_id, PARAMS, generated_data)
+
+def run(sizes, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = Session()
+        user = models.User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        chapter = models.Chapter(title="Bench", content_text="", owner_id=user.id)
+        db.add(chapter)
+        db.commit()
+        db.refresh(chapter)
+
+        print(f"{'questions':>10} {'per-row (s)':>12} {'bulk (s)':>10} {'speedup':>8}")
+        for size in sizes:
+            generated_data = make_generated(size)
+            timings = {}
+            for name, save in (("per-row", save_per_row), ("bulk", save_bulk)):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    save(db, chapter, user.id, generated_data)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[name] = best
+            print(f"{size:>10} {timings['per-row']:>12.4f} {timings['bulk']:>10.4f} {timings['per-row'] / timings['bulk']:>7.1f}x")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
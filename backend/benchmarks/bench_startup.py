@@ -0,0 +1,166 @@
+"""Startup benchmark: import time and boot-to-ready time of the API.
+
+Each run is a fresh interpreter, as a new uvicorn/gunicorn worker or
+autoscaled instance would be:
+
+    import   time to `import main`, measured inside the child process
+    boot     time from spawning uvicorn until GET /healthz answers, and
+             until GET /readyz answers 200
+
+The database is a scratch SQLite file, migrated once up front with
+`manage.py migrate`, so boots measure a worker joining an existing deploy.
+The report also lists which of the heavy optional libraries `import main`
+pulled in; they should all load lazily. Results are written as JSON and
+--compare diffs against an earlier run.
+
+    cd backend
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --compare benchmarks/results/startup-abc1234.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from benchmarks.bench_e2e import git_commit, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use by the services; none of them should be needed to serve /healthz
+LAZY_MODULES = ("groq", "docx", "reportlab", "pytesseract", "pdf2image", "pypdf", "PIL")
+
+IMPORT_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+def child_env(workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "EXPORT_CACHE_DIR": os.path.join(workdir, "export_cache"),
+        "GROQ_API_KEY": env.get("GROQ_API_KEY", "unused"),
+    })
+    return env
+
+def measure_import(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+def measure_boot(env: dict, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"healthz_seconds": None, "readyz_seconds": None}
+    try:
+        while time.perf_counter() - started < timeout and result["readyz_seconds"] is None:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            if result["healthz_seconds"] is None and _status(f"http://127.0.0.1:{port}/healthz") == 200:
+                result["healthz_seconds"] = time.perf_counter() - started
+            if result["healthz_seconds"] is not None and _status(f"http://127.0.0.1:{port}/readyz") == 200:
+                result["readyz_seconds"] = time.perf_counter() - started
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    if result["readyz_seconds"] is None:
+        raise RuntimeError(f"API was not ready within {timeout}s")
+    return result
+
+def summarize(values) -> dict:
+    return {
+        "runs": len(values),
+        "p50_ms": round(statistics.median(values) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "min_ms": round(min(values) * 1000, 1),
+    }
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"{'measure':<16} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'min ms':>9}")
+    for label, row in results.items():
+        line = f"{label:<16} {row['runs']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['min_ms']:>9.1f}"
+        before = (baseline or {}).get(label)
+        if before and before["p50_ms"]:
+            line += f"   p50 {100 * (row['p50_ms'] / before['p50_ms'] - 1):+.0f}%"
+        print(line)
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = child_env(workdir)
+        subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BACKEND_DIR, env=env, capture_output=True, check=True)
+
+        imports, loaded = [], set()
+        for _ in range(args.runs):
+            probe = measure_import(env)
+            imports.append(probe["seconds"])
+            loaded.update(probe["loaded"])
+
+        healthz, readyz = [], []
+        for _ in range(args.runs):
+            boot = measure_boot(env, args.timeout)
+            healthz.append(boot["healthz_seconds"])
+            readyz.append(boot["readyz_seconds"])
+
+    results = {
+        "import main": summarize(imports),
+        "boot to healthz": summarize(healthz),
+        "boot to readyz": summarize(readyz),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+    print(f"heavy modules loaded by import: {', '.join(sorted(loaded)) or 'none'}")
+
+    commit = git_commit()
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"startup-{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "config": {"runs": args.runs},
+            "results": results,
+            "eagerly_loaded": sorted(loaded),
+        }, f, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for /readyz per boot")
+    parser.add_argument("--output", default=None, help="Results JSON path (default benchmarks/results/startup-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to diff against")
+    main(parser.parse_args())
@@ -1,13 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from typing import Optional
+import hmac
+import logging
 import os
 
 load_dotenv()
 
-from app import models, database
-from app.routers import auth, upload, questions, export, attempts
+from app import logs
 
-models.Base.metadata.create_all(bind=database.engine)
+logs.configure()
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app import database, metrics, migrations, pagination
+from app.routers import auth, upload, questions, export, attempts, jobs, admin
+from app.services import jobs as generation_jobs, ingest
+
+# Apply the schema at startup; workers starting together take turns on the migration lock.
+# Set to false when deploys run `python manage.py migrate` first, so scaling out workers never touches the schema.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="ExamWiz API", version="0.1.0")
 
@@ -19,14 +34,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(upload.router)
 app.include_router(questions.router)
 app.include_router(export.router)
 app.include_router(attempts.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
+
+app.state.started = False
+app.state.schema_current = False
+
+@app.on_event("startup")
+def prepare_database():
+    if AUTO_MIGRATE:
+        migrations.upgrade(database.engine)
+        return
+    pending = migrations.pending(database.engine)
+    if pending:
+        raise RuntimeError(f"Database schema is not current ({', '.join(pending)}); run `python manage.py migrate`")
+
+@app.on_event("startup")
+def resume_background_work():
+    ingest.resume_pending_chapters()
+    generation_jobs.resume_pending_jobs()
+    app.state.started = True
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to ExamWiz API"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    if metrics.METRICS_TOKEN:
+        if not hmac.compare_digest(authorization or "", f"Bearer {metrics.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif not metrics.METRICS_PUBLIC:
+        raise HTTPException(status_code=403, detail="Metrics are disabled; set METRICS_TOKEN or METRICS_PUBLIC=true")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness: the process is serving requests. Touches nothing else."""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Readiness: startup finished, the database answers and the schema is current."""
+    problems = []
+    if not app.state.started:
+        problems.append("startup not finished")
+    try:
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        if not app.state.schema_current:
+            # Checked until it passes once; the schema does not go backwards under a running process
+            pending = migrations.pending(database.engine)
+            problems.extend(f"pending {item}" for item in pending)
+            app.state.schema_current = not pending
+    except SQLAlchemyError as e:
+        logger.warning("Readiness check could not reach the database: %s", e)
+        problems.append("database unavailable")
+    if problems:
+        return JSONResponse({"status": "unavailable", "problems": problems}, status_code=503)
+    return {"status": "ready"}
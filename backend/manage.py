@@ -0,0 +1,43 @@
+"""Maintenance commands.
+
+    cd backend
+    python manage.py migrate                  # create tables, apply pending migrations
+    python manage.py rebuild-stats            # all users
+    python manage.py rebuild-stats --user 42  # one user
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import database, logs, migrations
+from app.services import stats
+
+def migrate():
+    migrations.upgrade(database.engine)
+    print("Schema is up to date")
+
+def rebuild_stats(user_ids):
+    migrations.upgrade(database.engine)
+    db = database.SessionLocal()
+    try:
+        folded = stats.rebuild(db, user_ids or None)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt progress stats from {folded} attempt(s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Create missing tables and apply pending schema migrations")
+    rebuild_parser = commands.add_parser("rebuild-stats", help="Recompute user_stats and question_set_stats from exam attempts")
+    rebuild_parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only this user id (repeatable)")
+    args = parser.parse_args()
+    logs.configure()
+
+    if args.command == "migrate":
+        migrate()
+    elif args.command == "rebuild-stats":
+        rebuild_stats(args.user_ids)
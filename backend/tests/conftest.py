@@ -0,0 +1,80 @@
+"""Shared fixtures. The app runs against a scratch SQLite database and the fake LLM provider."""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="examwiz-tests-")
+# Set before the app is imported: its modules read configuration at import time
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    "UPLOAD_DIR": os.path.join(_workdir, "uploads"),
+    "EXPORT_CACHE_DIR": os.path.join(_workdir, "export_cache"),
+    "GROQ_API_KEY": "unused",
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_RPM": "100000",
+    "LLM_TPM": "100000000",
+})
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app import database, migrations, models
+from app.services import question_store
+
+_emails = itertools.count()
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrations.upgrade(database.engine)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def make_user(client):
+    """Register a new user and return (id, auth headers)."""
+    def make():
+        email = f"user{next(_emails)}@example.com"
+        created = client.post("/users/", json={"email": email, "password": "password123"})
+        token = client.post("/token", data={"username": email, "password": "password123"}).json()["access_token"]
+        return created.json()["id"], {"Authorization": f"Bearer {token}"}
+    return make
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+@pytest.fixture
+def make_question_set(db):
+    """Create a question set of generated questions on a new ready chapter.
+
+    Returns (question set, [question id as the str clients send, in insert order]).
+    """
+    def make(owner_id: int, generated: dict, is_exam: bool = False):
+        chapter = models.Chapter(owner_id=owner_id, title="Notes", content_text="text", status="ready")
+        db.add(chapter)
+        db.commit()
+        params = {
+            "num_mcqs": len(generated.get("mcqs", [])),
+            "num_short": len(generated.get("short_questions", [])),
+            "num_flashcards": len(generated.get("flashcards", [])),
+            "is_exam": is_exam,
+            "difficulty": "Easy",
+        }
+        question_set = question_store.create_question_set(db, chapter, owner_id, params, generated)
+        rows = db.query(models.Question.id).filter(models.Question.question_set_id == question_set.id).order_by(models.Question.id)
+        return question_set, [str(row.id) for row in rows]
+    return make
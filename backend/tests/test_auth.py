@@ -0,0 +1,23 @@
+import threading
+
+from app import auth
+
+def test_signup_and_login_hash_on_the_password_pool(client, monkeypatch):
+    threads = []
+    hash_password, verify_password = auth.get_password_hash, auth.verify_password
+
+    def record_hash(password):
+        threads.append(threading.current_thread().name)
+        return hash_password(password)
+
+    def record_verify(plain_password, hashed_password):
+        threads.append(threading.current_thread().name)
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth, "get_password_hash", record_hash)
+    monkeypatch.setattr(auth, "verify_password", record_verify)
+    assert client.post("/users/", json={"email": "pool@example.com", "password": "password123"}).status_code == 200
+    assert client.post("/token", data={"username": "pool@example.com", "password": "password123"}).status_code == 200
+    assert client.post("/token", data={"username": "pool@example.com", "password": "wrong"}).status_code == 401
+    assert len(threads) == 3
+    assert all(name.startswith("password-hash") for name in threads)
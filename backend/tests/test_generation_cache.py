@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from app.services import batch_sizing, llm, model_router, providers
+
+def _text(topic: str) -> str:
+    return f"{topic} converts light energy into chemical energy stored in glucose. " * 40
+
+def _calls():
+    return providers.FakeProvider._calls
+
+def _questions(result, key="mcqs"):
+    # Batches are collected in completion order
+    return {item["question"] for item in result[key]}
+
+@contextmanager
+def _batch_size(size: int):
+    sizer = batch_sizing.sizer.model(model_router.router.primary("Medium"))
+    original = sizer.size
+    sizer.size = size
+    try:
+        yield
+    finally:
+        sizer.size = original
+
+def test_cache_hits_survive_a_batch_size_change():
+    text = _text("Photosynthesis")
+    with _batch_size(8):
+        first = llm.generate_questions(text, num_mcqs=6, num_short=6, difficulty="Medium")
+    before = _calls()
+    with _batch_size(4):
+        second = llm.generate_questions(text, num_mcqs=6, num_short=6, difficulty="Medium")
+    assert _calls() == before
+    assert _questions(second) == _questions(first)
+    assert _questions(second, "short_questions") == _questions(first, "short_questions")
+
+def test_larger_request_generates_only_the_uncached_questions():
+    text = _text("Respiration")
+    with _batch_size(4):
+        first = llm.generate_questions(text, num_mcqs=4, difficulty="Medium", num_short=0)
+    with _batch_size(6):
+        before = _calls()
+        second = llm.generate_questions(text, num_mcqs=6, difficulty="Medium", num_short=0)
+    # One batch of 6: slots 0-3 come from the cache, only 2 questions are requested
+    assert _calls() == before + 1
+    assert len(second["mcqs"]) == 6
+    assert _questions(first) <= _questions(second)
@@ -0,0 +1,84 @@
+from sqlalchemy import func
+
+from app import models
+from app.services import grading, question_store
+
+QUESTIONS = {
+    "mcqs": [
+        {"question": "Capital of France?", "options": ["Berlin", "Paris", "Rome"], "correct_answer": "Paris"},
+        {"question": "2 + 2?", "options": ["3", "4"], "correct_answer": "B"},
+    ],
+    "short_questions": [{"question": "Powerhouse of the cell?", "answer": "The Mitochondria."}],
+}
+
+def test_normalize_ignores_case_punctuation_and_whitespace():
+    assert grading.normalize("  The   Mitochondria. ") == "the mitochondria"
+    assert grading.normalize("Mitochondria!") == grading.normalize("mitochondria")
+    assert grading.normalize(42) == "42"
+
+def test_answer_key_accepts_option_text_index_and_letter_answers():
+    rows = [
+        (1, "MCQ", '["Berlin", "Paris", "Rome"]', "paris"),
+        (2, "MCQ", '["3", "4"]', "B"),
+        (3, "SHORT", None, "The Mitochondria."),
+        (4, "FLASHCARD", None, "back"),
+    ]
+    answer_key = grading.AnswerKey.from_rows(rows)
+    assert answer_key.total == 3
+
+    score, results = answer_key.grade({"1": "Paris", "2": 1, "3": "the mitochondria"})
+    assert score == 3
+    assert results == {"1": True, "2": True, "3": True}
+
+    score, results = answer_key.grade({"1": " PARIS ", "2": True, "3": "nucleus"})
+    assert score == 1
+    assert results == {"1": True, "2": False, "3": False}
+
+def test_unanswered_questions_are_wrong():
+    answer_key = grading.AnswerKey.from_rows([(1, "SHORT", None, "yes")])
+    assert answer_key.grade({}) == (0, {"1": False})
+
+def test_answer_key_is_rebuilt_when_questions_are_added(db, user, make_question_set):
+    user_id, _ = user
+    question_set, _ = make_question_set(user_id, QUESTIONS)
+    first = grading.get_answer_key(db, question_set.id)
+    assert grading.get_answer_key(db, question_set.id) is first
+    assert first.total == 3
+
+    question_store.add_questions(db, question_set.id, {"short_questions": [{"question": "H2O?", "answer": "Water"}]}, "Easy")
+    second = grading.get_answer_key(db, question_set.id)
+    assert second is not first
+    assert second.total == 4
+    new_id = str(db.query(func.max(models.Question.id)).filter(models.Question.question_set_id == question_set.id).scalar())
+    assert grading.grade(db, question_set.id, {new_id: "water"})[0] == 1
+
+def test_attempt_score_is_computed_on_the_server(client, user, make_question_set):
+    user_id, headers = user
+    question_set, (mcq_paris, mcq_four, short) = make_question_set(user_id, QUESTIONS, is_exam=True)
+
+    response = client.post("/attempts/", headers=headers, json={
+        "question_set_id": question_set.id,
+        "answers": {mcq_paris: "Paris", mcq_four: "3", short: "THE mitochondria!"},
+        "score": 99,
+        "total_questions": 99,
+    })
+    assert response.status_code == 200
+    assert response.json()["score"] == 2
+    assert response.json()["total_questions"] == 3
+
+def test_attempt_on_another_users_set_is_rejected(client, make_user, make_question_set):
+    owner_id, _ = make_user()
+    _, intruder_headers = make_user()
+    question_set, _ = make_question_set(owner_id, QUESTIONS)
+    response = client.post("/attempts/", headers=intruder_headers, json={"question_set_id": question_set.id, "answers": {}})
+    assert response.status_code == 404
+
+def test_set_reusing_a_deleted_sets_id_gets_its_own_answer_key(db, user, make_question_set):
+    user_id, _ = user
+    deleted, _ = make_question_set(user_id, {"short_questions": [{"question": "Q?", "answer": "old answer"}]})
+    deleted_id = deleted.id
+    grading.get_answer_key(db, deleted_id)
+    question_store.delete_question_set(db, deleted_id)
+
+    replacement, [question_id] = make_question_set(user_id, {"short_questions": [{"question": "Q?", "answer": "new answer"}]})
+    assert grading.grade(db, replacement.id, {question_id: "new answer"})[0] == 1
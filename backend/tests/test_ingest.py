@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+
+from app import models
+from app.services import heartbeat, ingest
+
+def _chapter(db, user_id, body: bytes, status="pending", heartbeat_age=0):
+    content_hash = f"test-{time.monotonic_ns()}"
+    os.makedirs(ingest.UPLOAD_DIR, exist_ok=True)
+    with open(ingest.spool_path(content_hash), "wb") as f:
+        f.write(body)
+    chapter = models.Chapter(
+        owner_id=user_id, title="Notes", content_hash=content_hash, source_filename="notes.txt", status=status,
+        heartbeat_at=datetime.utcnow() - timedelta(seconds=heartbeat_age),
+    )
+    db.add(chapter)
+    db.commit()
+    return chapter.id
+
+def _wait_for(db, chapter_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        chapter = db.get(models.Chapter, chapter_id)
+        if chapter.status in ("ready", "failed"):
+            return chapter
+        time.sleep(0.05)
+    raise AssertionError(f"chapter {chapter_id} is still {chapter.status}")
+
+def test_chapter_is_extracted_once_when_submitted_by_several_workers(db, user, monkeypatch):
+    user_id, _ = user
+    chapter_id = _chapter(db, user_id, b"cell biology")
+    calls = []
+    release = threading.Event()
+
+    def slow_extract(content, filename, cache_scope=None):
+        calls.append(filename)
+        release.wait(5)
+        return content.decode("utf-8")
+
+    monkeypatch.setattr(ingest.ocr, "extract_text", slow_extract)
+    workers = [threading.Thread(target=ingest.process_chapter, args=(chapter_id,)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.2)
+    release.set()
+    for worker in workers:
+        worker.join()
+    assert len(calls) == 1
+    assert _wait_for(db, chapter_id).content_text == "cell biology"
+
+def test_abandoned_processing_chapter_is_recovered(db, user):
+    user_id, _ = user
+    chapter_id = _chapter(db, user_id, b"plate tectonics", status="processing", heartbeat_age=heartbeat.STALE_SECONDS + 5)
+    ingest.requeue_abandoned_chapters()
+    chapter = _wait_for(db, chapter_id)
+    assert (chapter.status, chapter.content_text) == ("ready", "plate tectonics")
+
+def test_live_processing_chapter_is_left_alone(db, user):
+    user_id, _ = user
+    chapter_id = _chapter(db, user_id, b"volcanoes", status="processing", heartbeat_age=1)
+    ingest.requeue_abandoned_chapters()
+    db.expire_all()
+    assert db.get(models.Chapter, chapter_id).status == "processing"
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import time
+
+from app import models
+from app.services import heartbeat, jobs
+
+PARAMS = {"num_mcqs": 3, "num_short": 0, "num_flashcards": 0, "is_exam": False, "difficulty": "Medium"}
+
+def _job(db, user_id, status, age_seconds):
+    chapter = models.Chapter(owner_id=user_id, title="Biology", content_text="Photosynthesis makes glucose from light. " * 50, status="ready")
+    db.add(chapter)
+    db.commit()
+    job = jobs.create_job(db, user_id, chapter.id, PARAMS)
+    job.status = status
+    job.updated_at = datetime.utcnow() - timedelta(seconds=age_seconds)
+    db.commit()
+    return job.id
+
+def _wait_for(db, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        job = db.get(models.GenerationJob, job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} is still {job.status}")
+
+def test_abandoned_running_job_is_rerun(db, user):
+    user_id, _ = user
+    job_id = _job(db, user_id, "running", heartbeat.STALE_SECONDS + 5)
+    jobs.requeue_abandoned_jobs()
+    job = _wait_for(db, job_id, ("completed", "failed"))
+    assert job.status == "completed"
+    assert job.question_set_id is not None
+
+def test_recently_heartbeated_job_is_left_alone(db, user):
+    user_id, _ = user
+    job_id = _job(db, user_id, "running", 1)
+    jobs.requeue_abandoned_jobs()
+    db.expire_all()
+    assert db.get(models.GenerationJob, job_id).status == "running"
+
+def test_held_jobs_are_heartbeated(db, user):
+    user_id, _ = user
+    job_id = _job(db, user_id, "running", heartbeat.STALE_SECONDS + 5)
+    jobs._tracker.hold(job_id)
+    try:
+        jobs._tracker.beat()
+    finally:
+        jobs._tracker.release(job_id)
+    jobs.requeue_abandoned_jobs()
+    db.expire_all()
+    job = db.get(models.GenerationJob, job_id)
+    assert job.status == "running"
+    assert job.updated_at > datetime.utcnow() - timedelta(seconds=5)
+
+def test_job_that_generates_nothing_fails(db, user, monkeypatch):
+    user_id, _ = user
+    job_id = _job(db, user_id, "queued", 0)
+    monkeypatch.setattr(jobs.llm, "generate_questions", lambda *args, **kwargs: {"mcqs": [], "short_questions": [], "flashcards": []})
+    jobs.run_job(job_id)
+    db.expire_all()
+    job = db.get(models.GenerationJob, job_id)
+    assert job.status == "failed"
+    assert "No questions" in job.error
+    assert job.question_set_id is None
@@ -0,0 +1,48 @@
+import time
+
+from app.services import model_router
+
+MODELS = ["big", "small"]
+
+def _router():
+    return model_router.ModelRouter({"Medium": MODELS}, MODELS)
+
+def _trip(router, model):
+    for _ in range(model_router.BREAKER_FAILURES):
+        router.record_failure(model, RuntimeError("boom"))
+
+def _cool_down(router, model):
+    router.health(model).open_until = time.monotonic() - 1
+
+def test_open_breaker_is_skipped():
+    router = _router()
+    _trip(router, "big")
+    assert router.route("Medium") == ["small"]
+    assert not router.allow("big", "Medium")
+
+def test_routing_does_not_spend_the_half_open_probe():
+    router = _router()
+    _trip(router, "big")
+    _cool_down(router, "big")
+    for _ in range(5):
+        assert router.route("Medium")[0] == "big"
+        assert router.primary("Medium") == "big"
+    assert router.health("big").state == model_router.OPEN
+
+    assert router.allow("big", "Medium")
+    assert router.health("big").state == model_router.HALF_OPEN
+    # One probe per cooldown: the next batch goes elsewhere until the probe reports back
+    assert router.route("Medium") == ["small"]
+    assert not router.allow("big", "Medium")
+
+    router.record_success("big", 1.0)
+    assert router.health("big").state == model_router.CLOSED
+    assert router.route("Medium") == MODELS
+
+def test_soonest_reopening_model_is_allowed_when_all_are_open():
+    router = _router()
+    _trip(router, "small")
+    _trip(router, "big")
+    router.health("small").open_until += 60
+    assert router.route("Medium") == ["big"]
+    assert router.allow("big", "Medium")
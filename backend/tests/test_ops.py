@@ -0,0 +1,21 @@
+import logging
+
+from app import logs, metrics
+
+def test_unknown_log_level_falls_back_to_info(monkeypatch):
+    monkeypatch.setattr(logs, "LOG_LEVEL", "VERBOSE")
+    logs.configure()
+    assert logging.getLogger("app").level == logging.INFO
+
+def test_metrics_are_closed_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    monkeypatch.setattr(metrics, "METRICS_PUBLIC", False)
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(metrics, "METRICS_PUBLIC", True)
+    assert client.get("/metrics").status_code == 200
+
+def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
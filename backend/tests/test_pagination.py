@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, pagination
+
+def test_cursor_round_trips():
+    timestamp = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    assert pagination.decode_cursor(pagination.encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "bm8tc2VwYXJhdG9y"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        pagination.decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+def _add_chapters(db, owner_id, count, tied=0):
+    """count chapters a second apart, newest last; the last `tied` share one timestamp."""
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        created_at = base + timedelta(seconds=min(i, count - tied))
+        db.add(models.Chapter(owner_id=owner_id, title=f"chapter {i}", content_text="", status="ready", created_at=created_at))
+    db.commit()
+    return [row.id for row in db.query(models.Chapter.id).filter(models.Chapter.owner_id == owner_id).order_by(models.Chapter.created_at.desc(), models.Chapter.id.desc())]
+
+def _walk(client, headers, limit):
+    ids, after, pages = [], None, 0
+    while True:
+        params = {"limit": limit, **({"after": after} if after else {})}
+        response = client.get("/chapters/", headers=headers, params=params)
+        assert response.status_code == 200
+        ids += [chapter["id"] for chapter in response.json()]
+        pages += 1
+        after = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if not after:
+            return ids, pages
+
+def test_cursor_pages_cover_every_row_once(client, db, user):
+    user_id, headers = user
+    expected = _add_chapters(db, user_id, 7, tied=3)
+    ids, pages = _walk(client, headers, limit=3)
+    assert ids == expected
+    assert pages == 3
+
+def test_no_cursor_after_a_short_page(client, db, user):
+    user_id, headers = user
+    _add_chapters(db, user_id, 2)
+    response = client.get("/chapters/", headers=headers, params={"limit": 5})
+    assert len(response.json()) == 2
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+
+def test_cursor_pages_only_the_callers_rows(client, db, make_user):
+    owner_id, owner_headers = make_user()
+    other_id, _ = make_user()
+    _add_chapters(db, other_id, 4)
+    expected = _add_chapters(db, owner_id, 4)
+    assert _walk(client, owner_headers, limit=2)[0] == expected
+
+def test_bad_cursor_is_rejected_by_the_endpoint(client, user):
+    _, headers = user
+    response = client.get("/chapters/", headers=headers, params={"after": "garbage"})
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+import json
+
+from app import database, migrations, models
+
+QUESTIONS = {"short_questions": [{"question": "H2O?", "answer": "water"}, {"question": "NaCl?", "answer": "salt"}]}
+
+def test_attempts_are_folded_into_stats(client, user, make_question_set):
+    user_id, headers = user
+    question_set, (water, salt) = make_question_set(user_id, QUESTIONS)
+    client.post("/attempts/", headers=headers, json={"question_set_id": question_set.id, "answers": {water: "water", salt: "sugar"}})
+    client.post("/attempts/", headers=headers, json={"question_set_id": question_set.id, "answers": {water: "water", salt: "salt"}})
+
+    summary = client.get("/attempts/stats", headers=headers).json()
+    assert summary["attempt_count"] == 2
+    assert summary["question_sets_attempted"] == 1
+    assert summary["average_percent"] == 75.0
+    [set_stats] = summary["question_sets"]
+    assert (set_stats["best_score"], set_stats["last_score"]) == (2, 2)
+    assert set_stats["error_counts"] == {salt: 1}
+
+def test_backfill_migration_folds_existing_attempts(client, db, user, make_question_set):
+    user_id, headers = user
+    question_set, (water, salt) = make_question_set(user_id, QUESTIONS)
+    # Stored without going through stats, as attempts made before the stats tables existed were
+    db.add(models.ExamAttempt(user_id=user_id, question_set_id=question_set.id, score=1, total_questions=2, answers=json.dumps({water: "water"})))
+    db.commit()
+    assert client.get("/attempts/stats", headers=headers).json()["attempt_count"] == 0
+
+    backfill = dict(migrations.MIGRATIONS)["0005_backfill_stats"]
+    with database.engine.begin() as conn:
+        backfill(conn)
+
+    summary = client.get("/attempts/stats", headers=headers).json()
+    assert summary["attempt_count"] == 1
+    assert summary["question_sets"][0]["error_counts"] == {salt: 1}
@@ -14,17 +14,8 @@ export default function ChapterView() {
     useEffect(() => {
         const fetchChapter = async () => {
             try {
-                // We might need a specific endpoint for single chapter, but for now let's assume we can get it from the list or add an endpoint
-                // Actually, let's check if we have a get chapter endpoint. 
-                // If not, we might need to add one or filter from the list.
-                // Checking backend... we only have /chapters/ (list) and /upload/chapter (create).
-                // I'll assume I need to add a GET /chapters/{id} endpoint or filter the list.
-                // Filtering list is inefficient but works for now if the list is small.
-                // Better: Add GET /chapters/{id} to backend.
-                // For this step, I'll try to fetch the list and find the chapter.
-                const response = await api.get('/chapters/');
-                const foundChapter = response.data.find(c => c.id === parseInt(id));
-                setChapter(foundChapter);
+                const response = await api.get(`/chapters/${id}`);
+                setChapter(response.data);
             } catch (error) {
                 console.error("Failed to fetch chapter", error);
             } finally {
@@ -13,19 +13,18 @@ export default function Dashboard() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [chaptersRes, questionSetsRes, attemptsRes] = await Promise.all([
+                const [chaptersRes, questionSetsRes, statsRes] = await Promise.all([
                     api.get('/chapters/'),
                     api.get('/questionsets/'),
-                    api.get('/attempts/user/')
+                    api.get('/attempts/stats')
                 ]);
                 setChapters(chaptersRes.data);
                 setQuestionSets(questionSetsRes.data);
 
                 const attemptsMap = {};
-                attemptsRes.data.forEach(attempt => {
-                    if (!attemptsMap[attempt.question_set_id]) {
-                        attemptsMap[attempt.question_set_id] = attempt;
-                    }
+                // Latest attempt per question set, from the progress summary
+                statsRes.data.question_sets.forEach(stats => {
+                    attemptsMap[stats.question_set_id] = { id: stats.last_attempt_id, score: stats.last_score, total_questions: stats.total_questions };
                 });
                 setAttempts(attemptsMap);
             } catch (error) {
@@ -74,11 +74,11 @@ export default function ExamView() {
         try {
             const attemptData = {
                 question_set_id: parseInt(id),
-                score: calculatedScore,
-                total_questions: questionSet.questions.length,
                 answers: answers
             };
             const response = await api.post('/attempts/', attemptData);
+            // The server grades the attempt; its score is authoritative
+            setScore(response.data.score);
             // Optional: Navigate to result view immediately or let user review here
             // navigate(`/results/${response.data.id}`);
         } catch (error) {
@@ -13,19 +13,16 @@ export default function QuestionSetsList() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [qsRes, attemptsRes] = await Promise.all([
+                const [qsRes, statsRes] = await Promise.all([
                     api.get('/questionsets/'),
-                    api.get('/attempts/user/')
+                    api.get('/attempts/stats')
                 ]);
                 setQuestionSets(qsRes.data);
 
-                // Map attempts by question_set_id
                 const attemptsMap = {};
-                attemptsRes.data.forEach(attempt => {
-                    // Keep the latest attempt if multiple
-                    if (!attemptsMap[attempt.question_set_id]) {
-                        attemptsMap[attempt.question_set_id] = attempt;
-                    }
+                // Latest attempt per question set, from the progress summary
+                statsRes.data.question_sets.forEach(stats => {
+                    attemptsMap[stats.question_set_id] = { id: stats.last_attempt_id, score: stats.last_score, total_questions: stats.total_questions };
                 });
                 setAttempts(attemptsMap);
             } catch (error) {
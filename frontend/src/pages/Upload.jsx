@@ -30,6 +30,21 @@ export default function Upload() {
         setFile(e.target.files[0]);
     };
 
+    // Text extraction (OCR) runs in the background; poll until the chapter is ready.
+    const waitForChapter = async (chapter) => {
+        let current = chapter;
+        while (current.status === 'pending' || current.status === 'processing') {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            current = (await api.get(`/chapters/${chapter.id}`)).data;
+        }
+        if (current.status === 'failed') {
+            const error = new Error(current.error);
+            error.response = { data: { detail: current.error } };
+            throw error;
+        }
+        return current;
+    };
+
     const handleUpload = async (e) => {
         e.preventDefault();
         if (!file || !title) return;
@@ -45,6 +60,7 @@ export default function Upload() {
                     'Content-Type': 'multipart/form-data',
                 },
             });
+            await waitForChapter(response.data);
             setChapterId(response.data.id);
             setStep(2);
         } catch (error) {
@@ -53,13 +69,27 @@ export default function Upload() {
                 alert("Session expired. Please login again.");
                 navigate('/login');
             } else {
-                alert("Upload failed. Please try again.");
+                alert(error.response?.data?.detail || "Upload failed. Please try again.");
             }
         } finally {
             setLoading(false);
         }
     };
 
+    // Generation runs as a background job; poll until it finishes.
+    const waitForJob = async (jobId) => {
+        while (true) {
+            const { data } = await api.get(`/jobs/${jobId}`);
+            if (data.status === 'completed') return data;
+            if (data.status === 'failed') {
+                const error = new Error(data.error);
+                error.response = { data: { detail: data.error } };
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1500));
+        }
+    };
+
     const handleGenerate = async () => {
         setLoading(true);
         try {
@@ -84,12 +114,13 @@ export default function Upload() {
             const response = await api.post(`/generate/${chapterId}`, null, {
                 params: params
             });
+            const job = await waitForJob(response.data.job_id);
             if (isFlashcardMode) {
-                navigate(`/flashcards/${response.data.question_set_id}`);
+                navigate(`/flashcards/${job.question_set_id}`);
             } else if (isExamMode) {
-                navigate(`/exam/${response.data.question_set_id}`);
+                navigate(`/exam/${job.question_set_id}`);
             } else {
-                navigate(`/questionsets/${response.data.question_set_id}`);
+                navigate(`/questionsets/${job.question_set_id}`);
             }
         } catch (error) {
             console.error("Generation failed", error);